@@ -0,0 +1,156 @@
+import time
+
+import numpy as np
+from scipy.sparse import issparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+# Dimensions of the reduced embeddings the coarse quantiser works in
+ANN_COMPONENTS = 128
+# Inverted lists probed per query; higher is slower but closer to exact
+DEFAULT_PROBES = 8
+
+
+class ExactIndex:
+    """
+    Brute-force nearest neighbours straight from the similarity engine. Used
+    for small catalogues and as the reference when measuring recall.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def search(self, index, k, **options):
+        return self.engine.top_k(index, k)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over reduced-dimensional embeddings.
+
+    The normalised feature matrix is projected to a few dense dimensions with
+    TruncatedSVD and clustered with k-means. A query scores only the products
+    in its n_probe closest clusters (or in more of them, when those are too
+    small to supply the k asked for), and those candidates are re-ranked
+    with the exact cosine from the similarity engine, so the scores returned
+    are exact even when the candidate set is not.
+    """
+
+    def __init__(self, engine, n_lists=None, n_probe=DEFAULT_PROBES, n_components=ANN_COMPONENTS, seed=0):
+        self.engine = engine
+        self.n_probe = n_probe
+        n = len(engine)
+
+        self.embeddings = reduce_dimensions(engine.matrix, n_components, seed)
+
+        # Coarse quantiser: about sqrt(N) lists
+        n_lists = n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, n_init=3, batch_size=max(1024, n_lists * 8))
+        kmeans.fit(self.embeddings)
+        self.centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+        # Lists stored CSR-style: members of list j are list_members[list_offsets[j]:list_offsets[j + 1]]
+        assignments = np.argmax(self.embeddings @ self.centroids.T, axis=1)
+        self.list_members = np.argsort(assignments, kind='stable').astype(np.int32)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    # Product indices in the n_probe lists closest to a product's embedding, and in as many more of
+    # the next closest lists as it takes to reach min_candidates products
+    def candidates(self, index, n_probe=None, min_candidates=0):
+        centroid_scores = self.centroids @ self.embeddings[index]
+        order = np.argsort(-centroid_scores, kind='stable')
+        covered = np.cumsum(np.diff(self.list_offsets)[order])
+        n_probe = max(n_probe or self.n_probe, int(np.searchsorted(covered, min_candidates)) + 1)
+        probes = order[:min(n_probe, self.n_lists)]
+        return np.concatenate([self.list_members[self.list_offsets[j]:self.list_offsets[j + 1]] for j in probes])
+
+    # Up to k nearest products (the product itself excluded); lists beyond n_probe are probed when
+    # the closest ones hold fewer than k other products, so only a catalogue smaller than k returns fewer
+    def search(self, index, k, n_probe=None):
+        candidates = self.candidates(index, n_probe, min_candidates=k + 1)
+        candidates = candidates[candidates != index]
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        scores = self.engine.candidate_scores(index, candidates)
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return candidates[top].astype(np.int64), scores[top]
+
+
+# Project rows to n_components dense dimensions and L2-normalise them
+def reduce_dimensions(matrix, n_components=ANN_COMPONENTS, seed=0):
+    # Embeddings that are already compact are used as they are
+    if not issparse(matrix) and matrix.shape[1] <= n_components:
+        return normalize(matrix).astype(np.float32)
+
+    n_components = min(n_components, matrix.shape[1] - 1, matrix.shape[0] - 1)
+    svd = TruncatedSVD(n_components=n_components, random_state=seed)
+    return normalize(svd.fit_transform(matrix)).astype(np.float32)
+
+
+def build_ann_index(engine, backend='ivf', **options):
+    """
+    Nearest-neighbour index for a similarity engine. backend is 'ivf' for the
+    approximate index or 'exact' for brute force; both expose
+    search(index, k) -> (ids, scores).
+    """
+    if backend == 'exact':
+        return ExactIndex(engine)
+    if backend == 'ivf':
+        return IVFIndex(engine, **options)
+    raise ValueError(f"Unknown ANN backend: {backend}")
+
+
+def recall_report(engine, index, k=10, n_queries=200, seed=0, **search_options):
+    """
+    Compare index against brute force on a random sample of products.
+    Returns recall@k (ties with the k-th true neighbour count as hits) and
+    the mean per-query latency of both in milliseconds.
+    """
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(engine), size=min(n_queries, len(engine)), replace=False)
+    exact = ExactIndex(engine)
+
+    hits = total = 0
+    exact_time = ann_time = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        truth, truth_scores = exact.search(query, k)
+        exact_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found, found_scores = index.search(query, k, **search_options)
+        ann_time += time.perf_counter() - start
+
+        # Variants often tie exactly, so any result scoring at least the k-th true score is a hit
+        if len(truth):
+            hits += min(len(truth), int(np.count_nonzero(found_scores >= truth_scores[-1] - 1e-9)))
+        total += len(truth)
+
+    return {
+        'k': k,
+        'queries': len(queries),
+        'recall': hits / total if total else 1.0,
+        'exact_ms': exact_time / len(queries) * 1000,
+        'ann_ms': ann_time / len(queries) * 1000,
+    }
+
+
+if __name__ == '__main__':
+    from artifacts import load_or_build
+    from recommender import SimilarityEngine
+
+    engine = SimilarityEngine(load_or_build('productdata.csv').similarity_features())
+    index = build_ann_index(engine)
+    print(f"{len(engine)} products, {index.n_lists} lists")
+    for n_probe in (1, 2, 4, 8, 16, index.n_lists):
+        report = recall_report(engine, index, n_probe=n_probe)
+        print(f"n_probe={n_probe:>3}  recall@{report['k']}={report['recall']:.3f}  ann={report['ann_ms']:.3f}ms  exact={report['exact_ms']:.3f}ms")
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MinMaxScaler
+
+from catalogue import NUMERIC_FEATURES, PIPELINE_VERSION, CatalogueModel, build_catalogue, pipeline_signature
+from metrics import MODEL_BUILD_SECONDS
+
+ARTIFACT_ROOT = '.artifacts'
+MANIFEST_FILE = 'manifest.json'
+
+
+# Cache key for a catalogue source: content hash plus pipeline version and configuration
+# (signature defaults to pipeline_signature() of the default configuration)
+def artifact_key(csv_path, signature=None):
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f"{signature or pipeline_signature()}-{digest.hexdigest()[:16]}"
+
+
+def artifact_dir(csv_path, root=ARTIFACT_ROOT):
+    return os.path.join(root, artifact_key(csv_path))
+
+
+def save_model(model, directory, build_info=None):
+    """
+    Write a CatalogueModel to directory. Everything is written to a temporary
+    sibling first and renamed into place, so readers never see a partial build.
+    build_info (e.g. stage timings) is recorded in the manifest as is.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+
+    try:
+        # Enriched catalogue in columnar form
+        model.df.reset_index(drop=True).to_feather(os.path.join(tmp, 'catalogue.feather'))
+
+        # Sparse feature matrix as raw CSR arrays so they can be memory-mapped
+        matrix = csr_matrix(model.feature_matrix)
+        np.save(os.path.join(tmp, 'features_data.npy'), matrix.data)
+        np.save(os.path.join(tmp, 'features_indices.npy'), matrix.indices)
+        np.save(os.path.join(tmp, 'features_indptr.npy'), matrix.indptr)
+
+        # TF-IDF vocabulary in column order plus idf weights
+        with open(os.path.join(tmp, 'vocabulary.json'), 'w') as f:
+            json.dump(model.tfidf.get_feature_names_out().tolist(), f)
+        np.save(os.path.join(tmp, 'idf.npy'), model.tfidf.idf_)
+
+        # Derived arrays (neighbour tables, embeddings, ...)
+        for name, array in model.arrays.items():
+            np.save(os.path.join(tmp, f'array_{name}.npy'), array)
+
+        manifest = {
+            'pipeline_version': PIPELINE_VERSION,
+            'created': time.time(),
+            'n_products': len(model.df),
+            'feature_shape': list(matrix.shape),
+            'scaler_min': model.scaler.data_min_.tolist(),
+            'scaler_max': model.scaler.data_max_.tolist(),
+            'arrays': sorted(model.arrays),
+            'numeric_weights': model.numeric_weights,
+            'drift': model.drift,
+            'neighbour_exact': model.neighbour_exact,
+            'build': build_info or {},
+        }
+        with open(os.path.join(tmp, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def prune_artifacts(root=ARTIFACT_ROOT, keep=()):
+    """
+    Remove every artifact build under root whose key is not in keep and
+    return the removed keys. Only directories holding a manifest count as
+    builds, so saves still in progress and unrelated files are left alone.
+    """
+    removed = []
+    try:
+        names = sorted(os.listdir(root))
+    except OSError:
+        return removed
+    for name in names:
+        directory = os.path.join(root, name)
+        if name in keep or not os.path.isfile(os.path.join(directory, MANIFEST_FILE)):
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def load_model(directory, mmap=True):
+    """
+    Load a CatalogueModel written by save_model. Arrays are memory-mapped
+    read-only unless mmap is False.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['pipeline_version'] != PIPELINE_VERSION:
+        raise ValueError(f"Artifact pipeline version {manifest['pipeline_version']} does not match {PIPELINE_VERSION}")
+
+    mmap_mode = 'r' if mmap else None
+
+    def load_array(name):
+        return np.load(os.path.join(directory, name), mmap_mode=mmap_mode)
+
+    df = feather.read_feather(os.path.join(directory, 'catalogue.feather'), memory_map=mmap)
+
+    feature_matrix = csr_matrix(
+        (load_array('features_data.npy'), load_array('features_indices.npy'), load_array('features_indptr.npy')),
+        shape=tuple(manifest['feature_shape'])
+    )
+
+    with open(os.path.join(directory, 'vocabulary.json')) as f:
+        vocabulary = json.load(f)
+    tfidf = restore_vectorizer(vocabulary, load_array('idf.npy'))
+    scaler = restore_scaler(manifest['scaler_min'], manifest['scaler_max'])
+
+    arrays = {name: load_array(f'array_{name}.npy') for name in manifest['arrays']}
+
+    return CatalogueModel(df, feature_matrix, tfidf, scaler, arrays, manifest.get('numeric_weights'), manifest.get('drift'),
+                          manifest.get('neighbour_exact', True))
+
+
+# Rebuild a fitted TfidfVectorizer from its vocabulary and idf weights
+def restore_vectorizer(vocabulary, idf):
+    tfidf = TfidfVectorizer(stop_words='english', vocabulary={term: i for i, term in enumerate(vocabulary)})
+    tfidf.idf_ = np.asarray(idf)
+    return tfidf
+
+
+# Rebuild a fitted MinMaxScaler from the per-feature data range
+def restore_scaler(data_min, data_max):
+    scaler = MinMaxScaler()
+    scaler.fit(pd.DataFrame([data_min, data_max], columns=NUMERIC_FEATURES, dtype=np.float64))
+    return scaler
+
+
+def load_or_build(csv_path, root=ARTIFACT_ROOT, key=None):
+    """
+    Load the artifacts for csv_path from root, building and saving them first
+    if this version of the catalogue has not been processed yet. key is the
+    artifact_key() of csv_path, if the caller has already computed it.
+    """
+    directory = os.path.join(root, key or artifact_key(csv_path))
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        try:
+            return load_model(directory)
+        except Exception:
+            # Corrupt or incompatible artifacts are rebuilt below
+            pass
+
+    with MODEL_BUILD_SECONDS.time():
+        model = build_catalogue(csv_path)
+    try:
+        save_model(model, directory)
+    except OSError:
+        # A read-only filesystem should not stop the app from serving
+        pass
+    return model
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fileio import atomic_write
+from metrics import CACHE_REQUESTS
+
+ASSET_CACHE_DIR = os.path.join('.cache', 'lottie')
+FETCH_TIMEOUT = 3
+# How long a failed asset keeps serving the fallback before it is fetched again
+RETRY_AFTER = 300
+
+# Simple pulsing circle shown whenever an animation cannot be fetched
+FALLBACK_ANIMATION = {
+    "v": "5.5.7",
+    "fr": 30,
+    "ip": 0,
+    "op": 60,
+    "w": 200,
+    "h": 200,
+    "nm": "Fallback Animation",
+    "ddd": 0,
+    "assets": [],
+    "layers": [{
+        "ddd": 0,
+        "ind": 1,
+        "ty": 4,
+        "nm": "Circle",
+        "sr": 1,
+        "ks": {
+            "o": {"a": 0, "k": 100},
+            "r": {"a": 0, "k": 0},
+            "p": {"a": 0, "k": [100, 100, 0]},
+            "a": {"a": 0, "k": [0, 0, 0]},
+            "s": {
+                "a": 1,
+                "k": [
+                    {"t": 0, "s": [100, 100, 100]},
+                    {"t": 30, "s": [120, 120, 100]},
+                    {"t": 60, "s": [100, 100, 100]}
+                ]
+            }
+        },
+        "shapes": [{
+            "ty": "el",
+            "p": {"a": 0, "k": [0, 0]},
+            "s": {"a": 0, "k": [80, 80]},
+            "d": 1,
+            "nm": "Ellipse Path 1",
+            "hd": False
+        }],
+        "style": {
+            "fill": {"a": 0, "k": [0.5, 0.2, 0.8]},
+            "stroke": {"a": 0, "k": [0.8, 0.4, 1]},
+            "strokeWidth": {"a": 0, "k": 4}
+        }
+    }]
+}
+
+# Process-wide caches shared by every session: asset key -> animation, asset key -> time of last failure
+_animations = {}
+_failures = {}
+_lock = threading.Lock()
+
+
+# lottiefiles serves the same file from several numbered CDN shards; treat them as one asset
+def asset_key(url):
+    return re.sub(r'^https?://assets\d*\.lottiefiles\.com/', 'lottiefiles/', url)
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+
+def _read_disk(key, cache_dir):
+    try:
+        with open(_cache_path(key, cache_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk(key, animation, cache_dir):
+    try:
+        with atomic_write(_cache_path(key, cache_dir)) as f:
+            json.dump(animation, f)
+    except OSError:
+        pass
+
+
+# Try each mirror of an asset in turn within one overall deadline, returning None if none respond
+def _fetch(urls, timeout):
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            r = requests.get(url, timeout=remaining)
+            if r.status_code == 200:
+                return r.json()
+        except (requests.RequestException, ValueError):
+            continue
+    return None
+
+
+def load_lottie_animations(urls, timeout=FETCH_TIMEOUT, cache_dir=ASSET_CACHE_DIR):
+    """
+    Load Lottie animations for urls, returning a dict of url -> animation.
+
+    Animations come from the in-process cache, then the on-disk cache, and
+    only then from the network, with all missing assets fetched concurrently
+    and bounded by timeout. Anything that cannot be loaded gets the fallback
+    animation, and is not retried for RETRY_AFTER seconds.
+    """
+    mirrors = {}
+    for url in urls:
+        mirrors.setdefault(asset_key(url), []).append(url)
+
+    now = time.time()
+    missing = {}
+    with _lock:
+        for key, key_urls in mirrors.items():
+            if key in _animations:
+                CACHE_REQUESTS.inc(cache='asset', result='hit')
+                continue
+            cached = _read_disk(key, cache_dir)
+            CACHE_REQUESTS.inc(cache='asset', result='miss' if cached is None else 'hit')
+            if cached is not None:
+                _animations[key] = cached
+            elif now - _failures.get(key, 0) >= RETRY_AFTER:
+                missing[key] = key_urls
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            fetched = dict(zip(missing, pool.map(lambda key_urls: _fetch(key_urls, timeout), missing.values())))
+        with _lock:
+            for key, animation in fetched.items():
+                if animation is None:
+                    _failures[key] = now
+                else:
+                    _animations[key] = animation
+                    _failures.pop(key, None)
+                    _write_disk(key, animation, cache_dir)
+
+    return {url: _animations.get(asset_key(url), FALLBACK_ANIMATION) for url in urls}
+
+
+# Load a single Lottie animation
+def load_lottieurl(url):
+    return load_lottie_animations([url])[url]
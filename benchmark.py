@@ -0,0 +1,202 @@
+"""
+Scaling benchmark for the catalogue pipeline, run without Streamlit:
+
+    python benchmark.py --sizes 1000 10000 100000 --out benchmark_results.json
+
+Each catalogue size runs in its own subprocess, so its peak RSS is its own.
+Every stage is timed on its own call, and each stage_seconds key is named
+after the call it times.
+Sizes above the real catalogue are synthetic catalogues from synthetic.py.
+The results file is JSON with stable keys, meant to be diffed between
+commits.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from fileio import atomic_write
+
+SIZES = [1000, 10000, 100000]
+SOURCE_CSV = 'productdata.csv'
+# Products queried in the recommendation and search stages
+QUERIES = 200
+SEARCH_QUERIES = ['wireless', 'boat rockerz', 'noise cancelling over ear', 'bass', 'sony wh']
+RECOMMEND_FILTERS = {'price_range': (500, 3000), 'min_rating': 3.5, 'connectivity': 'Wireless'}
+# Largest catalogue whose neighbour table is built exactly; bigger ones use the IVF index (ann.py).
+# The same default as catalogue.NEIGHBOUR_EXACT_LIMIT, which the app builds with
+EXACT_LIMIT = 20000
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(timings, name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def run_size(n_rows, source=SOURCE_CSV, seed=0, exact_limit=EXACT_LIMIT):
+    """Time every stage on a catalogue of n_rows. Returns a result dict."""
+    from ann import build_ann_index
+    from catalogue import (NUMERIC_FEATURES, CatalogueIndex, _lower_text, combined_texts, enrich_catalogue,
+                           extract_base_model, extract_battery_life, extract_connectivity, extract_type, fit_model,
+                           neighbour_backend, read_catalogue)
+    from recommender import SimilarityEngine, build_filter_columns, build_neighbour_table
+    from resources import CatalogueResources
+    from search import SearchIndex
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import MinMaxScaler
+    from synthetic import CatalogueProfile, write_synthetic_catalogue
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'catalogue.csv')
+        real = read_catalogue(source)
+        if n_rows <= len(real):
+            real.iloc[:n_rows].to_csv(csv_path, index=False)
+        else:
+            write_synthetic_catalogue(csv_path, n_rows, CatalogueProfile(real), seed)
+        raw = _timed(timings, 'csv_parse', read_catalogue, csv_path)
+
+    # Extractors one by one, on the same inputs enrich_catalogue gives them
+    name, description = _lower_text(raw['name']), _lower_text(raw['description'])
+    _timed(timings, 'extract_type', extract_type, name, description)
+    connectivity = _timed(timings, 'extract_connectivity', extract_connectivity, name, description)
+    _timed(timings, 'extract_battery_life', extract_battery_life, name, description, connectivity)
+    _timed(timings, 'extract_base_model', extract_base_model, raw['name'])
+
+    df = _timed(timings, 'enrich', enrich_catalogue, raw)
+    # The two fits on their own, then fit_model as a whole (both fits plus assembling the feature matrix)
+    _timed(timings, 'scaling', MinMaxScaler().fit_transform, df[NUMERIC_FEATURES])
+    _timed(timings, 'tfidf_fit', TfidfVectorizer(stop_words='english').fit_transform, combined_texts(df))
+    model = _timed(timings, 'fit_model', fit_model, df)
+
+    # Neighbour table in its stages, as add_neighbour_table builds it
+    engine = _timed(timings, 'similarity_engine', SimilarityEngine, model.similarity_features())
+    index = None
+    if neighbour_backend(len(df), 'auto', exact_limit) == 'ivf':
+        index = _timed(timings, 'ann_index', build_ann_index, engine)
+    base_models = pd.factorize(df['base_model'])[0]
+    model.arrays['neighbour_ids'], model.arrays['neighbour_scores'] = _timed(
+        timings, 'neighbour_table', build_neighbour_table, engine, base_models, ann_index=index)
+    model.neighbour_exact = index is None
+    neighbour_method = 'exact' if index is None else 'ivf'
+
+    # The serving indices on their own, then CatalogueResources as a whole (which builds them again)
+    _timed(timings, 'catalogue_index', CatalogueIndex, df, model.descriptions)
+    _timed(timings, 'filter_columns', build_filter_columns, df)
+    _timed(timings, 'search_index', SearchIndex.from_model, model)
+    resources = _timed(timings, 'resources_build', CatalogueResources, model, 'benchmark')
+
+    rng = np.random.default_rng(seed)
+    products = rng.integers(0, len(df), min(QUERIES, len(df)))
+    latencies = {}
+    for stage, filters in (('recommend_single', {}), ('recommend_filtered', RECOMMEND_FILTERS)):
+        # _recommend bypasses the shared result cache so every query does the work
+        start = time.perf_counter()
+        for product in products:
+            resources._recommend(*resources.request_key(product, 5, **filters))
+        latencies[stage] = (time.perf_counter() - start) / len(products)
+
+    start = time.perf_counter()
+    for product in products:
+        resources.similarity_engine.scores(product)
+    latencies['similarity_row'] = (time.perf_counter() - start) / len(products)
+
+    for prefix in (False, True):
+        start = time.perf_counter()
+        for query in SEARCH_QUERIES:
+            resources.search_index.search(query, prefix=prefix)
+        latencies['search_prefix' if prefix else 'search'] = (time.perf_counter() - start) / len(SEARCH_QUERIES)
+
+    return {
+        'rows': len(df),
+        'features': model.feature_matrix.shape[1],
+        'neighbour_method': neighbour_method,
+        'stage_seconds': timings,
+        'query_ms': {name: seconds * 1000 for name, seconds in latencies.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=SIZES, out='benchmark_results.json', source=SOURCE_CSV, seed=0, exact_limit=EXACT_LIMIT):
+    """Run every size in a fresh interpreter and write the combined results to out."""
+    results = []
+    for n_rows in sizes:
+        command = [sys.executable, __file__, '--worker', str(n_rows), '--source', source, '--seed', str(seed),
+                   '--exact-limit', str(exact_limit)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            results.append({'rows': n_rows, 'error': completed.stderr.strip().splitlines()[-1:]})
+        else:
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        print(f"{n_rows:>8} rows: {'failed' if 'error' in results[-1] else 'done'}", file=sys.stderr)
+
+    report = {
+        'commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'source': source,
+        'seed': seed,
+        'exact_limit': exact_limit,
+        'results': results,
+    }
+    with atomic_write(out) as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='catalogue sizes to benchmark')
+    parser.add_argument('--out', default='benchmark_results.json', help='results file to write')
+    parser.add_argument('--source', default=SOURCE_CSV, help='real catalogue the sizes are built from')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--exact-limit', type=int, default=EXACT_LIMIT, help='largest size whose neighbour table is built exactly')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_size(args.worker, args.source, args.seed, args.exact_limit)))
+        return 0
+
+    report = run(args.sizes, args.out, args.source, args.seed, args.exact_limit)
+    for result in report['results']:
+        if 'error' in result:
+            print(f"{result['rows']:>8} rows  error: {result['error']}")
+            continue
+        stages = result['stage_seconds']
+        print(f"{result['rows']:>8} rows  parse {stages['csv_parse']:.2f}s  enrich {stages['enrich']:.2f}s  "
+              f"fit {stages['fit_model']:.2f}s  neighbours {stages['neighbour_table']:.2f}s ({result['neighbour_method']})  "
+              f"recommend {result['query_ms']['recommend_filtered']:.2f}ms  search {result['query_ms']['search']:.3f}ms  "
+              f"peak {result['peak_rss_mb']:.0f}MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
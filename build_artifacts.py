@@ -0,0 +1,129 @@
+"""
+Build the catalogue artifacts without the web app, e.g. from CI or cron:
+
+    python build_artifacts.py --csv productdata.csv --workers 8
+
+Writes the same artifact directory load_or_build() looks for, so serving
+nodes that receive it load it instead of building. Each stage is timed and
+the timings are printed and recorded in the artifact manifest.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from artifacts import ARTIFACT_ROOT, MANIFEST_FILE, artifact_key, load_model, save_model
+from ann import DEFAULT_PROBES
+from catalogue import (CHUNK_ROWS, NEIGHBOUR_BACKEND, NEIGHBOUR_BACKENDS, NEIGHBOUR_EXACT_LIMIT, add_neighbour_table,
+                       fit_model, ingest_catalogue, neighbour_backend, pipeline_signature)
+from fileio import atomic_write
+
+
+class StageTimer:
+    """Wall-clock seconds per named stage, in the order the stages ran."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def report(self):
+        width = max(len(name) for name in self.timings)
+        lines = [f"{name:<{width}}  {seconds:8.3f}s" for name, seconds in self.timings.items()]
+        lines.append(f"{'total':<{width}}  {sum(self.timings.values()):8.3f}s")
+        return '\n'.join(lines)
+
+
+def build(csv_path, root=ARTIFACT_ROOT, workers=None, block_size=256, chunksize=CHUNK_ROWS,
+          lazy_descriptions=True, similar_items=None, top_n=10, force=False, threads=1,
+          neighbours=NEIGHBOUR_BACKEND, exact_limit=NEIGHBOUR_EXACT_LIMIT, n_probe=DEFAULT_PROBES):
+    """
+    Build and save the artifacts for csv_path, returning the artifact
+    directory and the StageTimer. Artifacts already built for the same
+    catalogue and pipeline are reused (only the export runs) unless force
+    is set. The neighbour table is built on workers processes, or on
+    threads threads when workers is 1.
+
+    neighbours, exact_limit and n_probe choose how the neighbour table is
+    built (see catalogue.neighbour_backend) and are part of the artifact
+    key, so serving nodes only pick up builds made with their own settings.
+    """
+    workers = workers or os.cpu_count() or 1
+    timer = StageTimer()
+
+    with timer.stage('hash'):
+        key = artifact_key(csv_path, pipeline_signature(neighbours=neighbours, exact_limit=exact_limit, n_probe=n_probe))
+    directory = os.path.join(root, key)
+
+    if not force and os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        if similar_items:
+            with timer.stage('load'):
+                model = load_model(directory)
+    else:
+        with timer.stage('ingest'):
+            df, descriptions = ingest_catalogue(csv_path, chunksize, lazy_descriptions)
+        with timer.stage('fit'):
+            model = fit_model(df, descriptions=descriptions)
+        with timer.stage('neighbours'):
+            add_neighbour_table(model, workers=workers, block_size=block_size, backend=neighbours, threads=threads,
+                                exact_limit=exact_limit, n_probe=n_probe)
+        with timer.stage('save'):
+            backend = neighbour_backend(len(model.df), neighbours, exact_limit)
+            save_model(model, directory, build_info={'workers': workers, 'threads': threads, 'block_size': block_size,
+                                                     'neighbours': backend, 'n_probe': n_probe if backend == 'ivf' else None,
+                                                     'timings': dict(timer.timings)})
+
+    if similar_items:
+        from resources import CatalogueResources
+
+        with timer.stage('similar_items'):
+            with atomic_write(similar_items, newline='') as f:
+                CatalogueResources(model, key).similar_items(top_n, block_size).to_csv(f, index=False)
+
+    return directory, timer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='productdata.csv', help='catalogue CSV to build from')
+    parser.add_argument('--root', default=ARTIFACT_ROOT, help='directory holding artifact builds')
+    parser.add_argument('--workers', type=int, default=None, help='processes for the neighbour table (default: all cores)')
+    parser.add_argument('--threads', type=int, default=1, help='threads for the neighbour table when --workers is 1')
+    parser.add_argument('--neighbours', choices=NEIGHBOUR_BACKENDS, default=NEIGHBOUR_BACKEND,
+                        help='neighbour table backend (auto: exact up to --exact-limit products, IVF above)')
+    parser.add_argument('--exact-limit', type=int, default=NEIGHBOUR_EXACT_LIMIT,
+                        help='largest catalogue built exactly with --neighbours auto')
+    parser.add_argument('--n-probe', type=int, default=DEFAULT_PROBES, help='inverted lists probed per product by the IVF backend')
+    parser.add_argument('--block-size', type=int, default=256, help='rows per all-pairs block')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='CSV rows per ingest chunk')
+    parser.add_argument('--lazy-descriptions', action=argparse.BooleanOptionalAction, default=True,
+                        help='keep descriptions out of the catalogue frame, in a memory-mapped store')
+    parser.add_argument('--similar-items', metavar='PATH', help='also export every product\'s top-N similar items as CSV')
+    parser.add_argument('--top-n', type=int, default=10, help='similar items per product in the export')
+    parser.add_argument('--force', action='store_true', help='rebuild even if the artifacts already exist')
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args(argv)
+
+    directory, timer = build(args.csv, args.root, args.workers, args.block_size, args.chunksize,
+                             args.lazy_descriptions, args.similar_items, args.top_n, args.force, args.threads,
+                             args.neighbours, args.exact_limit, args.n_probe)
+
+    if args.json:
+        print(json.dumps({'directory': directory, 'timings': timer.timings}, indent=2))
+    else:
+        built = 'ingest' in timer.timings
+        print(f"Artifacts {'written to' if built else 'already built:'} {directory}")
+        print(timer.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,540 @@
+import hashlib
+import json
+import os
+import tempfile
+from array import array
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from pandas.api.types import union_categoricals
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MinMaxScaler
+from scipy.sparse import hstack
+
+from ann import DEFAULT_PROBES, build_ann_index
+from recommender import SimilarityEngine, build_neighbour_table
+
+# Bump whenever the enrichment or feature pipeline changes so cached artifacts are rebuilt
+PIPELINE_VERSION = 6
+
+NUMERIC_FEATURES = ['price', 'rating', 'reviews']
+NORMALIZED_FEATURES = ['price_normalized', 'rating_normalized', 'reviews_normalized']
+
+# Weight of each normalised numeric column relative to the text features in the similarity vectors
+NUMERIC_WEIGHTS = {'price_normalized': 1.0, 'rating_normalized': 1.0, 'reviews_normalized': 1.0}
+# Normalised value given to a missing price, rating or review count in the similarity vectors
+MISSING_NORMALIZED = 0.5
+# Dimensions of the optional LSA text embedding used for similarity instead of the raw TF-IDF
+# matrix (None keeps the sparse matrix)
+EMBEDDING_DIM = None
+
+# How the neighbour table is built: 'exact' (all pairs, quadratic in the catalogue size), 'ivf'
+# (approximate, from the inverted-file index in ann.py) or 'auto', which is exact up to
+# NEIGHBOUR_EXACT_LIMIT products and IVF above
+NEIGHBOUR_BACKEND = 'auto'
+NEIGHBOUR_EXACT_LIMIT = 20_000
+NEIGHBOUR_BACKENDS = ('auto', 'exact', 'ivf')
+
+# Rows per chunk when streaming the catalogue CSV
+CHUNK_ROWS = 50_000
+# Column dtypes of the raw catalogue; text columns not listed keep the default string dtype.
+# rating stays float64: its one-decimal values are not exact in float32 and would leak into
+# the UI (4.1 -> 4.099999904632568) and shift min_rating comparisons. Integer columns are parsed
+# as nullable Int32 so missing values do not fail the read (see iter_catalogue_chunks)
+CATALOGUE_SCHEMA = {
+    'brand': 'category',
+    'category': 'category',
+    'price': 'Int32',
+    'rating': np.float64,
+    'reviews': 'Int32',
+    'availability': 'Int32',
+    'loyaltypoints': 'Int32',
+}
+
+# Keyword and battery-life patterns used by the extractors, in priority order
+TYPE_KEYWORDS = [
+    ('Over-Ear', ['over', 'over-ear']),
+    ('On-Ear', ['on', 'on-ear']),
+    ('In-Ear', ['in', 'in-ear', 'earphone']),
+]
+WIRELESS_KEYWORDS = ['wireless', 'bluetooth']
+BATTERY_PATTERNS = [
+    r'(\d+)\s*hours',
+    r'(\d+)\s*hrs',
+    r'(\d+)\s*hr',
+    r'(\d+)\s*h\b',
+    r'(\d+)-hour'
+]
+# Assume 20 hours for wireless if not specified
+DEFAULT_WIRELESS_BATTERY = 20
+
+# Low-cardinality text columns held as categoricals and integer columns narrowed to int32
+CATEGORICAL_COLUMNS = ['brand', 'category', 'type', 'connectivity', 'base_model']
+INTEGER_COLUMNS = ['price', 'reviews', 'availability', 'loyaltypoints', 'battery_life']
+
+TYPE_DTYPE = pd.CategoricalDtype([label for label, _ in TYPE_KEYWORDS] + ['Other'])
+CONNECTIVITY_DTYPE = pd.CategoricalDtype(['Wired', 'Wireless'])
+
+
+class CatalogueModel:
+    """
+    The enriched catalogue together with everything fitted on it: the feature
+    matrix, the TF-IDF vectorizer, the numeric scaler and any derived arrays
+    (e.g. neighbour tables) that should be cached alongside it.
+
+    numeric_weights records how the numeric columns were weighted, and drift
+    counts the incremental updates applied since the last full fit and the
+    tokens they brought in (see updates.py). neighbour_exact is False when the neighbour table was
+    built from an approximate index, so a short row does not mean the
+    catalogue ran out of neighbours.
+    """
+
+    def __init__(self, df, feature_matrix, tfidf, scaler, arrays=None, numeric_weights=None, drift=None,
+                 neighbour_exact=True):
+        self.df = df
+        self.feature_matrix = feature_matrix
+        self.tfidf = tfidf
+        self.scaler = scaler
+        self.arrays = arrays if arrays is not None else {}
+        self.numeric_weights = dict(numeric_weights or NUMERIC_WEIGHTS)
+        self.drift = dict(drift or {'tokens': 0, 'unknown_tokens': 0, 'updates': 0})
+        self.neighbour_exact = neighbour_exact
+
+    # Vectors used for similarity: the LSA embeddings when built, otherwise the sparse feature matrix
+    def similarity_features(self):
+        return self.arrays.get('embeddings', self.feature_matrix)
+
+    # Descriptions kept out of the frame (see ingest_catalogue), or None when df holds them
+    @property
+    def descriptions(self):
+        if 'description_bytes' not in self.arrays:
+            return None
+        return DescriptionStore(self.arrays['description_bytes'], self.arrays['description_offsets'])
+
+
+class DescriptionStore:
+    """
+    Product descriptions packed into one UTF-8 byte buffer plus row offsets.
+    They take a fraction of the memory of a column of Python strings, are
+    saved with the other model arrays (so they are memory-mapped on load), and
+    a description is only decoded when it is asked for.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts):
+        encoded = [str(text).encode('utf-8') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    # Store holding the given rows, in the given order
+    def take(self, rows):
+        return DescriptionStore.from_texts(self[i] for i in rows)
+
+    def to_arrays(self):
+        return {'description_bytes': self.data, 'description_offsets': self.offsets}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class DescriptionSpool:
+    """
+    Builds a DescriptionStore a batch of texts at a time without keeping the
+    texts in memory. The UTF-8 bytes are appended to an anonymous temporary
+    file and finish() memory-maps it, so the store's buffer is paged in from
+    disk as descriptions are read rather than held on the heap.
+    """
+
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._lengths = array('q')
+
+    def append(self, texts):
+        for text in texts:
+            encoded = str(text).encode('utf-8')
+            self._file.write(encoded)
+            self._lengths.append(len(encoded))
+
+    # The finished store; the spool can't be appended to afterwards
+    def finish(self):
+        self._file.flush()
+        offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(self._lengths, dtype=np.int64), out=offsets[1:])
+        # A zero-length file can't be mapped; the mapping outlives the closed file
+        data = np.memmap(self._file, dtype=np.uint8, mode='r') if offsets[-1] else np.empty(0, dtype=np.uint8)
+        self._file.close()
+        return DescriptionStore(data, offsets)
+
+
+class CatalogueIndex:
+    """
+    Constant-time lookups into the enriched catalogue: product name -> row id
+    and row id -> record. When several rows share a name the first row wins,
+    the same row that df[df['name'] == name].iloc[0] would return.
+
+    When the descriptions are kept in a DescriptionStore, pass it as
+    descriptions and records get their 'description' from it.
+    """
+
+    def __init__(self, df, descriptions=None):
+        self.df = df
+        self.descriptions = descriptions
+        names = df['name'].astype(str)
+        first = ~names.duplicated(keep='first').to_numpy()
+        self.row_ids = dict(zip(names[first], np.flatnonzero(first).tolist()))
+        self._records = {}
+
+    def __contains__(self, name):
+        return name in self.row_ids
+
+    def __len__(self):
+        return len(self.df)
+
+    # Row id for a product name, or None if it is not in the catalogue
+    def row_id(self, name):
+        return self.row_ids.get(name)
+
+    # Column -> value dict for a row (shared between callers, so treat it as read-only)
+    def record(self, row_id):
+        record = self._records.get(row_id)
+        if record is None:
+            record = self.df.iloc[row_id].to_dict()
+            if self.descriptions is not None:
+                record['description'] = self.descriptions[row_id]
+            self._records[row_id] = record
+        return record
+
+    # Record for a product name; raises KeyError if it is not in the catalogue
+    def by_name(self, name):
+        row_id = self.row_ids.get(name)
+        if row_id is None:
+            raise KeyError(name)
+        return self.record(row_id)
+
+
+# Nullable integer columns as plain int32, or as float64 with NaN (as pandas reads them untyped) when values are missing
+def _plain_integers(chunk):
+    for column in chunk.columns:
+        if isinstance(chunk[column].dtype, pd.Int32Dtype):
+            missing = chunk[column].isna().any()
+            chunk[column] = chunk[column].to_numpy(dtype=np.float64 if missing else np.int32, na_value=np.nan if missing else 0)
+    return chunk
+
+
+# Raw catalogue CSV in chunks of chunksize rows, typed with CATALOGUE_SCHEMA
+def iter_catalogue_chunks(path, chunksize=CHUNK_ROWS):
+    # The schema is keyed by clean column names, the header may have stray whitespace
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {column: CATALOGUE_SCHEMA[column.strip()] for column in header if column.strip() in CATALOGUE_SCHEMA}
+
+    with pd.read_csv(path, dtype=dtype, chunksize=chunksize) as reader:
+        for chunk in reader:
+            # Clean up column names (remove whitespace)
+            chunk.columns = chunk.columns.str.strip()
+            yield _plain_integers(chunk)
+
+
+# Concatenate frames, merging each categorical column's categories so it stays categorical.
+# The input frames are left as they are
+def concat_chunks(chunks):
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            parts = [chunk[column].astype('category') for chunk in chunks]
+            categories = union_categoricals(parts, sort_categories=True).categories
+            chunks = [chunk.assign(**{column: part.cat.set_categories(categories)}) for chunk, part in zip(chunks, parts)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+# Arrow picks the narrowest index type for each chunk's categories; widen them so that the
+# categories of all chunks together still fit
+def _wide_dictionaries(schema):
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+    return schema
+
+
+# Concatenate frames through uncompressed Feather files in a temporary directory: each frame is
+# written out as it arrives and the files are memory-mapped back together, so at most one input
+# frame is in memory next to the result (string columns stay backed by the mapped files).
+# Categorical columns get the sorted union of their categories, as with concat_chunks
+def concat_spilled(frames, directory=None):
+    with tempfile.TemporaryDirectory(prefix='catalogue-', dir=directory, ignore_cleanup_errors=True) as spill:
+        paths, categories = [], {}
+        for i, frame in enumerate(frames):
+            for column in frame.columns:
+                if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                    categories.setdefault(column, set()).update(frame[column].cat.categories)
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            paths.append(os.path.join(spill, f'{i:06d}.feather'))
+            feather.write_feather(table.cast(_wide_dictionaries(table.schema)), paths[-1], compression='uncompressed')
+            del frame, table
+
+        tables = [feather.read_table(path, memory_map=True) for path in paths]
+        # Chunks where an Int32 column had no missing values come back as int32, others as float64
+        df = pa.concat_tables(tables, promote_options='permissive').unify_dictionaries().to_pandas()
+    for column, values in categories.items():
+        df[column] = df[column].cat.set_categories(sorted(values))
+    return df
+
+
+# Read the raw catalogue CSV
+def read_catalogue(path, chunksize=CHUNK_ROWS):
+    return concat_spilled(iter_catalogue_chunks(path, chunksize))
+
+
+def _enriched_chunks(path, chunksize, spool):
+    for chunk in iter_catalogue_chunks(path, chunksize):
+        chunk = enrich_catalogue(chunk)
+        if spool is not None:
+            spool.append(chunk['description'])
+            chunk = chunk.drop(columns=['description'])
+        yield chunk
+
+
+def ingest_catalogue(path, chunksize=CHUNK_ROWS, lazy_descriptions=True):
+    """
+    Stream the catalogue CSV in chunks of chunksize rows and run the
+    extractors on each chunk as it arrives. Returns (df, descriptions).
+
+    Enriched chunks are spilled to disk and memory-mapped back as one frame
+    (see concat_spilled) rather than collected and concatenated in memory,
+    so besides the result only one chunk is resident at a time.
+
+    With lazy_descriptions (the default) the description column is dropped
+    from every chunk once enriched and the descriptions are spooled to a
+    memory-mapped DescriptionStore, so neither the frame nor the heap holds
+    them. Otherwise descriptions is None and df keeps the column.
+    """
+    spool = DescriptionSpool() if lazy_descriptions else None
+    df = concat_spilled(_enriched_chunks(path, chunksize, spool))
+    return compact_catalogue(df), (spool.finish() if spool is not None else None)
+
+
+def _lower_text(series):
+    return series.astype(str).fillna('').str.lower()
+
+
+# True where any keyword appears in the name or description
+def _contains_any(name, description, keywords):
+    mask = pd.Series(False, index=name.index)
+    for keyword in keywords:
+        mask |= name.str.contains(keyword, regex=False) | description.str.contains(keyword, regex=False)
+    return mask
+
+
+# Extract headphone type from name or description
+def extract_type(name, description):
+    conditions = [_contains_any(name, description, keywords).to_numpy() for _, keywords in TYPE_KEYWORDS]
+    labels = [label for label, _ in TYPE_KEYWORDS]
+    return pd.Series(np.select(conditions, labels, default='Other'), index=name.index)
+
+
+# Extract connectivity type
+def extract_connectivity(name, description):
+    wireless = _contains_any(name, description, WIRELESS_KEYWORDS).to_numpy()
+    return pd.Series(np.where(wireless, 'Wireless', 'Wired'), index=name.index)
+
+
+# Extract battery life if available: the first pattern that matches wins, preferring the name
+def extract_battery_life(name, description, connectivity):
+    battery = pd.Series(np.nan, index=name.index)
+    unresolved = pd.Series(True, index=name.index)
+
+    for pattern in BATTERY_PATTERNS:
+        # Cheap match test first, so the capturing extract only runs on the rows this pattern decides
+        probe = pattern.replace('(', '(?:')
+        for text in (name, description):
+            hits = unresolved & text.str.contains(probe, regex=True)
+            if hits.any():
+                battery[hits] = pd.to_numeric(text[hits].str.extract(pattern, expand=False))
+                unresolved &= ~hits
+        if not unresolved.any():
+            break
+
+    # Default value based on connectivity
+    default = np.where(connectivity == 'Wired', 0, DEFAULT_WIRELESS_BATTERY)
+    return battery.fillna(pd.Series(default, index=name.index)).astype(np.int32)
+
+
+# Model name without the trailing "(Colour)" variant suffix
+def extract_base_model(names):
+    names = names.astype(str)
+    has_variant = names.str.contains('(', regex=False)
+    return names.str.split('(', n=1).str[0].str.strip().where(has_variant, names)
+
+
+# Derive type, connectivity, battery life and base model columns
+def enrich_catalogue(df):
+    name = _lower_text(df['name'])
+    description = _lower_text(df['description'])
+
+    df['type'] = extract_type(name, description).astype(TYPE_DTYPE)
+    df['connectivity'] = extract_connectivity(name, description).astype(CONNECTIVITY_DTYPE)
+    df['battery_life'] = extract_battery_life(name, description, df['connectivity'])
+    df['base_model'] = extract_base_model(df['name'])
+    return compact_catalogue(df)
+
+
+# Store low-cardinality columns as categoricals and integer columns as int32, in place
+def compact_catalogue(df):
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    for column in INTEGER_COLUMNS:
+        if column in df and df[column].dtype == np.int64:
+            df[column] = df[column].astype(np.int32)
+    return df
+
+
+# Combined name, brand, description and category text the TF-IDF features are built from. It is
+# generated row by row on demand rather than kept as a column, which would duplicate those columns;
+# descriptions come from the description column unless a DescriptionStore is given
+def combined_texts(df, descriptions=None):
+    if descriptions is None:
+        descriptions = df['description']
+    return (f"{name} {brand} {description} {category}"
+            for name, brand, description, category in zip(df['name'], df['brand'], descriptions, df['category']))
+
+
+def memory_report(df):
+    """
+    Per-column memory use of a catalogue frame, largest first: dtype, bytes
+    (including the strings behind object and string columns) and share of
+    the total. The last row is the total.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+        'share': usage / max(usage.sum(), 1),
+    }).sort_values('bytes', ascending=False)
+    report.loc['total'] = ['', usage.sum(), 1.0]
+    return report
+
+
+# Identifies the pipeline version and configuration that produced a model
+def pipeline_signature(embedding_dim=None, numeric_weights=None, neighbours=None, exact_limit=None, n_probe=None):
+    config = {
+        'embedding_dim': EMBEDDING_DIM if embedding_dim is None else embedding_dim,
+        'numeric_weights': numeric_weights or NUMERIC_WEIGHTS,
+        'neighbours': {
+            'backend': neighbours or NEIGHBOUR_BACKEND,
+            'exact_limit': NEIGHBOUR_EXACT_LIMIT if exact_limit is None else exact_limit,
+            'n_probe': DEFAULT_PROBES if n_probe is None else n_probe,
+        },
+    }
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:8]
+    return f"v{PIPELINE_VERSION}-{digest}"
+
+
+# Normalised numeric columns (as returned by the scaler) scaled by their configured weights;
+# missing values, which the scaler passes through as NaN, become MISSING_NORMALIZED
+def weighted_numeric_features(normalized, numeric_weights=None):
+    numeric_weights = numeric_weights or NUMERIC_WEIGHTS
+    weights = np.array([numeric_weights[column] for column in NORMALIZED_FEATURES], dtype=np.float64)
+    return np.nan_to_num(np.asarray(normalized, dtype=np.float64), nan=MISSING_NORMALIZED) * weights
+
+
+# Fit the scaler and TF-IDF vectorizer and build the combined feature matrix
+def build_model(df, embedding_dim=None, numeric_weights=None, descriptions=None):
+    return add_neighbour_table(fit_model(df, embedding_dim, numeric_weights, descriptions))
+
+
+# The fitting half of build_model: everything but the neighbour table
+def fit_model(df, embedding_dim=None, numeric_weights=None, descriptions=None):
+    embedding_dim = EMBEDDING_DIM if embedding_dim is None else embedding_dim
+
+    compact_catalogue(df)
+
+    # Normalize numerical features; features use full precision, the frame keeps float32 copies for display
+    scaler = MinMaxScaler()
+    normalized = scaler.fit_transform(df[NUMERIC_FEATURES])
+    df[NORMALIZED_FEATURES] = normalized.astype(np.float32)
+
+    # TF-IDF for text features
+    tfidf = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = tfidf.fit_transform(combined_texts(df, descriptions))
+
+    # Combine TF-IDF and numerical features
+    numerical_features = weighted_numeric_features(normalized, numeric_weights)
+    feature_matrix = hstack([tfidf_matrix, numerical_features]).tocsr()
+
+    model = CatalogueModel(df, feature_matrix, tfidf, scaler, numeric_weights=numeric_weights)
+    if descriptions is not None:
+        model.arrays.update(descriptions.to_arrays())
+
+    # Optional compact embeddings replace the sparse matrix for similarity
+    if embedding_dim:
+        embeddings, components = embed_features(tfidf_matrix, numerical_features, embedding_dim)
+        model.arrays['embeddings'] = embeddings
+        model.arrays['svd_components'] = components
+
+    return model
+
+
+def embed_features(tfidf_matrix, numerical_features, embedding_dim, seed=0):
+    """
+    LSA embedding: project the TF-IDF block onto its top embedding_dim
+    singular vectors and append the (weighted) numeric columns. Returns the
+    float32 embeddings and the projection components needed to embed new
+    rows the same way.
+    """
+    embedding_dim = min(embedding_dim, tfidf_matrix.shape[1] - 1, tfidf_matrix.shape[0] - 1)
+    svd = TruncatedSVD(n_components=embedding_dim, random_state=seed)
+    text_embedding = svd.fit_transform(tfidf_matrix)
+    embeddings = np.hstack([text_embedding, numerical_features]).astype(np.float32)
+    return embeddings, svd.components_.astype(np.float32)
+
+
+# The backend ('exact' or 'ivf') a neighbour table of n_products is built with
+def neighbour_backend(n_products, backend=None, exact_limit=None):
+    backend = backend or NEIGHBOUR_BACKEND
+    if backend not in NEIGHBOUR_BACKENDS:
+        raise ValueError(f"Unknown neighbour backend: {backend}")
+    if backend == 'auto':
+        exact_limit = NEIGHBOUR_EXACT_LIMIT if exact_limit is None else exact_limit
+        return 'exact' if n_products <= exact_limit else 'ivf'
+    return backend
+
+
+# Precompute each product's top-K distinct-model neighbours, exactly (optionally across worker
+# processes or threads) or from an IVF index probing n_probe lists; see neighbour_backend
+def add_neighbour_table(model, workers=1, block_size=256, backend=None, threads=1, exact_limit=None, n_probe=None):
+    base_models = pd.factorize(model.df['base_model'])[0]
+    engine = SimilarityEngine(model.similarity_features())
+    index = None
+    if neighbour_backend(len(model.df), backend, exact_limit) == 'ivf':
+        index = build_ann_index(engine, 'ivf', n_probe=DEFAULT_PROBES if n_probe is None else n_probe)
+    neighbour_ids, neighbour_scores = build_neighbour_table(engine, base_models, block_size=block_size,
+                                                            ann_index=index, workers=workers, threads=threads)
+    model.arrays['neighbour_ids'] = neighbour_ids
+    model.arrays['neighbour_scores'] = neighbour_scores
+    model.neighbour_exact = index is None
+    return model
+
+
+# Full pipeline from CSV to fitted model
+def build_catalogue(path, chunksize=CHUNK_ROWS, lazy_descriptions=True):
+    df, descriptions = ingest_catalogue(path, chunksize, lazy_descriptions)
+    return build_model(df, descriptions=descriptions)
+
+
+if __name__ == '__main__':
+    from artifacts import load_or_build
+
+    print(memory_report(load_or_build('productdata.csv').df).to_string())
@@ -0,0 +1,27 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode='w', **open_kwargs):
+    """
+    Open a temporary sibling of path for writing and rename it over path once
+    the block completes, so readers only ever see a whole file. If the block
+    or the rename fails, the temporary file is removed and path is left as it
+    was. Missing parent directories are created.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    replaced = False
+    try:
+        with open(tmp, mode, **open_kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+        replaced = True
+    finally:
+        if not replaced:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,169 @@
+import re
+import threading
+from functools import lru_cache
+
+# Features shown as chips on a Discover card
+CARD_FEATURES = 3
+
+FEATURE_SEPARATORS = re.compile(r'[,.]')
+
+
+# Function to extract features from product description
+def extract_features(description):
+    # Split by commas or periods
+    if isinstance(description, str):
+        features = FEATURE_SEPARATORS.split(description)
+        # Clean up and filter out empty features
+        return [f.strip() for f in features if f.strip()]
+    return []
+
+
+# Function to render star rating (ratings repeat a lot, so each distinct one is built once)
+@lru_cache(maxsize=256)
+def render_star_rating(rating):
+    full_stars = int(rating)
+    half_star = rating - full_stars >= 0.5
+    empty_stars = 5 - full_stars - (1 if half_star else 0)
+
+    stars_html = '<span class="star">★</span>' * (full_stars + half_star)
+    stars_html += '<span class="star star-empty">★</span>' * empty_stars
+    return f'<div class="star-rating">{stars_html} <span style="margin-left: 0.5rem;">{rating}</span></div>'
+
+
+def _battery_badge(product):
+    return f'<span class="badge badge-accent">{product["battery_life"]}h Battery</span>' if product['battery_life'] > 0 else ''
+
+
+def _badges(product):
+    return f"""
+    <div style="margin: 1rem 0;">
+        <span class="badge badge-primary">{product['type']}</span>
+        <span class="badge badge-secondary">{product['connectivity']}</span>
+        {_battery_badge(product)}
+    </div>
+    """
+
+
+def _feature_list(features):
+    items = ''.join(f'<li class="feature-item"><span class="feature-icon">✓</span> {feature}</li>' for feature in features)
+    return f'<ul class="feature-list">{items}</ul>'
+
+
+def _feature_chips(features):
+    chips = ''.join(f'<span class="discover-product-feature">{feature}</span>' for feature in features)
+    return f'<div class="discover-product-features">{chips}</div>'
+
+
+# Inside of a similar-products card; the wrapper carrying the animation delay is added per render
+def _similar_card(product):
+    return f"""
+        <div class="card-overlay"></div>
+        <div class="product-image-container">
+            <img src="{product['image_url']}" class="product-image" alt="{product['name']}">
+        </div>
+        <h3 class="product-title">{product['name'][:50]}...</h3>
+        <p class="product-brand">{product['brand']}</p>
+        <div class="product-meta">
+            <span class="price-tag">₹{product['price']}</span>
+            <span class="rating-tag">★ {product['rating']}</span>
+        </div>
+        <button class="custom-button" style="width: 100%;" onclick="alert('View product details')">
+            View Details
+        </button>
+    """
+
+
+# Image column of a Discover result; the match badge is added per render
+def _discover_image(product):
+    return f"""
+        <div class="discover-product-image-container">
+            <img src="{product['image_url']}" class="discover-product-image" alt="{product['name']}">
+        </div>
+    </div>
+    """
+
+
+def _discover_body(product):
+    return f"""
+    <h3 class="discover-product-title">{product['name']}</h3>
+    <p class="discover-product-brand">By {product['brand']}</p>
+
+    <div class="discover-product-meta">
+        <span class="price-tag">₹{product['price']}</span>
+        <span class="rating-tag">★ {product['rating']} ({product['reviews']:,} reviews)</span>
+    </div>
+
+    <div style="margin: 0.5rem 0;">
+        <span class="badge badge-primary">{product['type']}</span>
+        <span class="badge badge-secondary">{product['connectivity']}</span>
+        {_battery_badge(product)}
+    </div>
+
+    <p class="discover-product-description">{product['description']}</p>
+    """
+
+
+class FragmentCache:
+    """
+    Pre-rendered HTML fragments for product cards, built once per product
+    and shared by every session, so a rerun only joins cached strings. The
+    fragments are the same in both themes (colours come from the
+    stylesheet's CSS variables). Create one per catalogue version
+    (CatalogueResources does), so fragments never outlive the data they were
+    rendered from.
+
+    Only the parts that depend on the request (match percentage, animation
+    delay) are formatted per render.
+    """
+
+    def __init__(self, catalogue_index):
+        self.catalogue_index = catalogue_index
+        self._fragments = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, row_id, render):
+        key = (kind, row_id)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = render(self.catalogue_index.record(row_id))
+            with self._lock:
+                self._fragments.setdefault(key, fragment)
+        return fragment
+
+    def __len__(self):
+        return len(self._fragments)
+
+    # Render every fragment for the given rows up front
+    def warm(self, row_ids):
+        for row_id in row_ids:
+            self.features(row_id)
+            self.badges(row_id)
+            self.feature_list(row_id)
+            self.feature_chips(row_id)
+            self.similar_card(row_id)
+            self.discover_card(row_id)
+            self.discover_body(row_id)
+
+    # Description split into feature phrases
+    def features(self, row_id):
+        return self._get('features', row_id, lambda product: tuple(extract_features(product['description'])))
+
+    def badges(self, row_id):
+        return self._get('badges', row_id, _badges)
+
+    def feature_list(self, row_id):
+        return self._get('feature_list', row_id, lambda product: _feature_list(self.features(row_id)))
+
+    def feature_chips(self, row_id):
+        return self._get('feature_chips', row_id, lambda product: _feature_chips(self.features(row_id)[:CARD_FEATURES]))
+
+    def similar_card(self, row_id, delay=0.0):
+        inner = self._get('similar_card', row_id, _similar_card)
+        return f'<div class="product-card animate-fade-in" style="animation-delay: {delay}s;">{inner}</div>'
+
+    def discover_card(self, row_id, match_percentage=0):
+        image = self._get('discover_image', row_id, _discover_image)
+        return f'<div class="discover-product-card"><div class="discover-match-badge">{match_percentage}% Match</div>{image}'
+
+    def discover_body(self, row_id):
+        return self._get('discover_body', row_id, _discover_body)
@@ -0,0 +1,325 @@
+"""
+Process-wide metrics in the Prometheus text exposition format.
+
+Metrics live in `registry` and are exported, when configured, to a textfile
+(SOUNDMATCH_METRICS_FILE, rewritten every METRICS_INTERVAL seconds) and/or an
+HTTP endpoint (SOUNDMATCH_METRICS_PORT, served at /metrics), for a sidecar to
+scrape. Each app replica exports its own process.
+"""
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fileio import atomic_write
+
+METRICS_FILE_ENV = 'SOUNDMATCH_METRICS_FILE'
+METRICS_PORT_ENV = 'SOUNDMATCH_METRICS_PORT'
+METRICS_HOST = '127.0.0.1'
+METRICS_INTERVAL = 15
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Request latencies, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Catalogue builds, in seconds
+BUILD_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# A session counts as active for this many seconds after its last rerun
+SESSION_TIMEOUT = 300
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metric:
+    """
+    One named metric with a fixed set of label names. Values are kept per
+    combination of label values, given as keyword arguments.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    # (suffix, label pairs, value) of every sample
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [('', tuple(zip(self.labelnames, key)), value) for key, value in values]
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or be read from a function at export time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    # Read the (unlabelled) value from fn whenever the metric is exported
+    def set_function(self, fn):
+        self._function = fn
+
+    def samples(self):
+        if self._function is not None:
+            return [('', (), self._function())]
+        return super().samples()
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    # Context manager observing the time spent in its block
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        samples = []
+        for key, (counts, total) in values:
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', labels + (('le', _format_value(bound)),), cumulative))
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, cumulative))
+        return samples
+
+
+class Registry:
+    """Metrics of this process by name; creating a metric that exists returns the existing one."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def exposition(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return '\n'.join(metric.exposition() for _, metric in metrics) + '\n'
+
+
+registry = Registry()
+
+RECOMMENDATION_SECONDS = registry.histogram(
+    'soundmatch_recommendation_seconds', 'Time to answer a recommendation request, cache hits included')
+SEARCH_SECONDS = registry.histogram('soundmatch_search_seconds', 'Time to answer a product search')
+CACHE_REQUESTS = registry.counter(
+    'soundmatch_cache_requests_total', 'Cache lookups by cache (data, result, asset) and result (hit, miss)',
+    ('cache', 'result'))
+MODEL_BUILD_SECONDS = registry.histogram(
+    'soundmatch_model_build_seconds', 'Time to build the catalogue model when no artifacts were saved',
+    buckets=BUILD_BUCKETS)
+CATALOGUE_PRODUCTS = registry.gauge('soundmatch_catalogue_products', 'Products in the catalogue being served')
+ACTIVE_SESSIONS = registry.gauge(
+    'soundmatch_active_sessions', f'Sessions with a rerun in the last {SESSION_TIMEOUT} seconds')
+
+# Session id -> time of its last rerun, least recently seen first
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+# Forget sessions last seen before cutoff, stopping at the first one still active; call with _sessions_lock held
+def _prune_sessions(cutoff):
+    while _sessions:
+        session_id, seen = next(iter(_sessions.items()))
+        if seen >= cutoff:
+            break
+        del _sessions[session_id]
+
+
+# Record a rerun of a session. Expired sessions are dropped here too, so the table holds only the
+# sessions of the last SESSION_TIMEOUT seconds even when the gauge is never exported
+def touch_session(session_id):
+    now = time.monotonic()
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+        _sessions[session_id] = now
+        _prune_sessions(now - SESSION_TIMEOUT)
+
+
+def active_sessions(timeout=SESSION_TIMEOUT):
+    with _sessions_lock:
+        _prune_sessions(time.monotonic() - timeout)
+        return len(_sessions)
+
+
+ACTIVE_SESSIONS.set_function(active_sessions)
+
+
+def write_metrics(path, registry=registry):
+    """Write the exposition to path atomically, so a scraper never reads a partial file."""
+    with atomic_write(path) as f:
+        f.write(registry.exposition())
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = registry
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.exposition().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host=METRICS_HOST):
+    """Serve /metrics on a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+def start_metrics_writer(path, interval=METRICS_INTERVAL):
+    """Rewrite path every interval seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                write_metrics(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='metrics-writer', daemon=True)
+    thread.start()
+    return thread
+
+
+_exporting = False
+_export_lock = threading.Lock()
+
+
+def start_metrics_export():
+    """
+    Start the exporters configured by SOUNDMATCH_METRICS_PORT and
+    SOUNDMATCH_METRICS_FILE, once per process; later calls do nothing.
+    """
+    global _exporting
+    with _export_lock:
+        if _exporting:
+            return
+        _exporting = True
+        port = os.environ.get(METRICS_PORT_ENV)
+        if port:
+            try:
+                start_metrics_server(int(port))
+            except (OSError, ValueError):
+                # Another replica on this host may hold the port; the textfile can still be used
+                pass
+        path = os.environ.get(METRICS_FILE_ENV)
+        if path:
+            start_metrics_writer(path)
@@ -0,0 +1,345 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, issparse
+from sklearn.preprocessing import normalize
+
+# Neighbours kept per product in the precomputed neighbour table
+NEIGHBOUR_K = 50
+
+
+class SimilarityEngine:
+    """
+    On-demand cosine similarity over the product feature matrix.
+
+    Rows are L2-normalised once, so the similarity of one product against the
+    whole catalogue is a single row-vector product and no N x N matrix is
+    ever materialised. The feature matrix may be the sparse TF-IDF + numeric
+    matrix or dense float32 embeddings.
+    """
+
+    def __init__(self, feature_matrix):
+        if issparse(feature_matrix):
+            self.matrix = normalize(csr_matrix(feature_matrix, dtype=np.float64), norm='l2', axis=1)
+        else:
+            self.matrix = normalize(np.asarray(feature_matrix, dtype=np.float32), norm='l2', axis=1)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    # Cosine similarity of one product against every product
+    def scores(self, index):
+        return _dense(self.matrix @ self.matrix[index].T).ravel()
+
+    # Cosine similarity of one product against the given candidates
+    def candidate_scores(self, index, candidates):
+        return _dense(self.matrix[candidates] @ self.matrix[index].T).ravel()
+
+    # Dense similarity of products start..stop against every product
+    def block_scores(self, start, stop):
+        return _dense(self.matrix[start:stop] @ self.matrix.T)
+
+    # Dense similarity of the given products against every product
+    def rows_scores(self, rows):
+        return _dense(self.matrix[rows] @ self.matrix.T)
+
+    # Top k most similar products (excluding the product itself), best first
+    def top_k(self, index, k):
+        scores = self.scores(index)
+        scores[index] = -np.inf
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        order = np.lexsort((candidates, -scores[candidates]))
+        top = candidates[order]
+        return top, scores[top]
+
+
+def _dense(result):
+    return result.toarray() if issparse(result) else np.asarray(result)
+
+
+def top_k_per_row(scores, ids, k):
+    """
+    The k best entries of every row of a 2-D score array, ranked by
+    (-score, id) so ties go to the lower id; -inf entries never qualify.
+    Returns (rows, columns, ranks) of the selected entries, ordered by row
+    then rank. Only the entries at or above each row's k-th best score are
+    sorted, never whole rows.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    cutoff = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+    rows, columns = np.nonzero((scores >= cutoff) & np.isfinite(scores))
+    order = np.lexsort((ids[rows, columns], -scores[rows, columns], rows))
+    rows, columns = rows[order], columns[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = ranks < k
+    return rows[keep], columns[keep], ranks[keep]
+
+
+# Map fn over blocks in order, on a thread pool when threads > 1
+def _map_blocks(fn, blocks, threads=1):
+    if threads > 1 and len(blocks) > 1:
+        with ThreadPoolExecutor(max_workers=min(threads, len(blocks))) as pool:
+            return list(pool.map(fn, blocks))
+    return [fn(block) for block in blocks]
+
+
+# Column arrays used by the vectorized filter-and-rank path
+def build_filter_columns(df):
+    return {
+        'price': df['price'].to_numpy(dtype=np.float64),
+        'rating': df['rating'].to_numpy(dtype=np.float64),
+        'connectivity': df['connectivity'].astype(object).to_numpy(),
+        'type': df['type'].astype(object).to_numpy(),
+        'brand': df['brand'].astype(object).to_numpy(),
+        'base_model': pd.factorize(df['base_model'])[0],
+    }
+
+
+# Boolean mask of products passing every filter
+def build_filter_mask(columns, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None):
+    mask = np.ones(len(columns['price']), dtype=bool)
+
+    if price_range:
+        price = columns['price']
+        mask &= ~((price < price_range[0]) | (price > price_range[1]))
+
+    if min_rating:
+        mask &= ~(columns['rating'] < min_rating)
+
+    if connectivity:
+        mask &= columns['connectivity'] == connectivity
+
+    if headphone_type:
+        mask &= columns['type'] == headphone_type
+
+    if brand:
+        mask &= columns['brand'] == brand
+
+    return mask
+
+
+def rank_candidates(scores, candidates, base_models, top_n):
+    """
+    The top_n of candidates by score, keeping only the best-scoring candidate
+    per base model. Ties go to the lower index.
+    """
+    if len(candidates) == 0 or top_n <= 0:
+        return candidates[:0]
+
+    # Best product per base model: sort by (model, -score, index) and keep the first of each model
+    order = candidates[np.lexsort((candidates, -scores[candidates], base_models[candidates]))]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = base_models[order[1:]] != base_models[order[:-1]]
+    representatives = order[first]
+
+    # Pull top_n without sorting every representative (ties at the cut-off go to the lower index)
+    if len(representatives) > top_n:
+        rep_scores = scores[representatives]
+        cutoff = -np.partition(-rep_scores, top_n - 1)[top_n - 1]
+        representatives = representatives[rep_scores >= cutoff]
+    return representatives[np.lexsort((representatives, -scores[representatives]))][:top_n]
+
+
+def rank_recommendations(scores, product_index, columns, top_n, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None):
+    """
+    Indices of the top_n products most similar to product_index that pass the
+    filters, keeping only the best-scoring product per base model.
+    """
+    base_models = columns['base_model']
+
+    mask = build_filter_mask(columns, price_range, min_rating, connectivity, headphone_type, brand)
+    mask &= base_models != base_models[product_index]
+    return rank_candidates(scores, np.flatnonzero(mask), base_models, top_n)
+
+
+def batch_recommendations(engine, product_indices, columns, top_n, block_size=256, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None):
+    """
+    rank_recommendations for many products sharing the same filters.
+
+    Similarities come from one sparse matrix x matrix product per block of
+    block_size products, and the dedup by base model and the top-k selection
+    are vectorized across the whole block. Returns (ids, scores) of shape
+    (len(product_indices), top_n), best first, padded with -1 / NaN where
+    fewer than top_n products qualify; each row equals what
+    rank_recommendations returns for that product.
+    """
+    product_indices = np.asarray(product_indices, dtype=np.int64)
+    ids = np.full((len(product_indices), top_n), -1, dtype=np.int64)
+    scores = np.full((len(product_indices), top_n), np.nan, dtype=np.float64)
+    base_models = columns['base_model']
+
+    # Passing products ordered by (base model, index), so each model is one contiguous column group
+    passing = np.flatnonzero(build_filter_mask(columns, price_range, min_rating, connectivity, headphone_type, brand))
+    if len(passing) == 0 or top_n <= 0:
+        return ids, scores
+    passing = passing[np.argsort(base_models[passing], kind='stable')]
+    passing_models = base_models[passing]
+    starts = np.flatnonzero(np.r_[True, passing_models[1:] != passing_models[:-1]])
+    sizes = np.diff(np.r_[starts, len(passing)])
+
+    for start in range(0, len(product_indices), block_size):
+        block = product_indices[start:start + block_size]
+        block_scores = engine.rows_scores(block)[:, passing]
+        # A product's own model is never recommended
+        block_scores[passing_models[None, :] == base_models[block][:, None]] = -np.inf
+
+        # Best score per model, and the lowest index reaching it
+        model_scores = np.maximum.reduceat(block_scores, starts, axis=1)
+        reaches = block_scores == np.repeat(model_scores, sizes, axis=1)
+        model_ids = np.minimum.reduceat(np.where(reaches, passing[None, :], len(base_models)), starts, axis=1)
+
+        rows, groups, rank = top_k_per_row(model_scores, model_ids, top_n)
+        ids[start + rows, rank] = model_ids[rows, groups]
+        scores[start + rows, rank] = model_scores[rows, groups]
+
+    return ids, scores
+
+
+# Top k distinct-model neighbours of one product, ranking only the highest scores unless dedup needs more
+def distinct_neighbours(scores, product_index, base_models, k):
+    eligible = base_models != base_models[product_index]
+    n_eligible = int(eligible.sum())
+    shortlist = min(n_eligible, 4 * k)
+    if shortlist == 0:
+        return np.empty(0, dtype=np.int64)
+
+    masked = np.where(eligible, scores, -np.inf)
+    cutoff = -np.partition(-masked, shortlist - 1)[shortlist - 1]
+    candidates = np.flatnonzero(eligible & (scores >= cutoff))
+    top = rank_candidates(scores, candidates, base_models, k)
+    if len(top) < k and len(candidates) < n_eligible:
+        top = rank_candidates(scores, np.flatnonzero(eligible), base_models, k)
+    return top
+
+
+# Neighbour table rows start..stop, from one block of all-pairs scores
+def neighbour_block(engine, base_models, k, start, stop):
+    neighbour_ids = np.full((stop - start, k), -1, dtype=np.int32)
+    neighbour_scores = np.full((stop - start, k), np.nan, dtype=np.float32)
+    block = engine.block_scores(start, stop)
+    for offset, row_scores in enumerate(block):
+        top = distinct_neighbours(row_scores, start + offset, base_models, k)
+        neighbour_ids[offset, :len(top)] = top
+        neighbour_scores[offset, :len(top)] = row_scores[top]
+    return neighbour_ids, neighbour_scores
+
+
+# Engine and settings each worker process receives once, rather than with every block
+_worker_state = {}
+
+
+def _init_neighbour_worker(engine, base_models, k):
+    _worker_state.update(engine=engine, base_models=base_models, k=k)
+
+
+def _neighbour_worker(bounds):
+    return bounds[0], neighbour_block(start=bounds[0], stop=bounds[1], **_worker_state)
+
+
+def build_neighbour_table(engine, base_models, k=NEIGHBOUR_K, block_size=256, ann_index=None, workers=1, threads=1):
+    """
+    Precompute every product's top k neighbours, deduplicated by base model
+    exactly as rank_recommendations does without filters. Returns int32 ids
+    and float32 scores of shape (N, k); rows with fewer than k other models
+    are padded with -1 / NaN.
+
+    The all-pairs pass runs block_size rows at a time, so peak memory is
+    O(block_size x N + N x k); with workers > 1 the blocks are sharded across
+    that many processes, otherwise threads > 1 runs them on a thread pool.
+
+    With an ann_index (see ann.py) candidates come from the index instead of
+    an all-pairs pass, which makes the table approximate but keeps the build
+    sub-quadratic for large catalogues.
+    """
+    n = len(engine)
+    neighbour_ids = np.full((n, k), -1, dtype=np.int32)
+    neighbour_scores = np.full((n, k), np.nan, dtype=np.float32)
+
+    if ann_index is not None:
+        for i in range(n):
+            # Widen the candidate pool (the index probes further lists to fill it) until dedup by base model leaves k neighbours
+            pool = 4 * k
+            while True:
+                candidates, candidate_scores = ann_index.search(i, pool)
+                keep = base_models[candidates] != base_models[i]
+                candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+                order = np.argsort(candidates)
+                candidates, candidate_scores = candidates[order], candidate_scores[order]
+                local = rank_candidates(candidate_scores, np.arange(len(candidates)), base_models[candidates], k)
+                if len(local) >= k or pool >= n:
+                    break
+                pool *= 4
+            neighbour_ids[i, :len(local)] = candidates[local]
+            neighbour_scores[i, :len(local)] = candidate_scores[local]
+        return neighbour_ids, neighbour_scores
+
+    blocks = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks)), initializer=_init_neighbour_worker,
+                                 initargs=(engine, base_models, k)) as pool:
+            results = list(pool.map(_neighbour_worker, blocks))
+    else:
+        results = _map_blocks(lambda bounds: (bounds[0], neighbour_block(engine, base_models, k, *bounds)), blocks, threads)
+
+    for start, (block_ids, block_scores) in results:
+        neighbour_ids[start:start + len(block_ids)] = block_ids
+        neighbour_scores[start:start + len(block_ids)] = block_scores
+
+    return neighbour_ids, neighbour_scores
+
+
+def neighbour_recommendations(neighbour_ids, neighbour_scores, product_index, columns, top_n, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None, exact=True):
+    """
+    Serve rank_recommendations from the precomputed neighbour table.
+
+    Returns (indices, scores), or None when the table cannot give the exact
+    answer and the caller has to fall back to a full scan: either the
+    filters exhaust a truncated row, or a neighbour was rejected by the
+    filters while a sibling variant of the same base model passes (the full
+    scan would return that sibling instead).
+
+    In an exact table a row padded with -1 lists every other model, so it is
+    never truncated. Pass exact=False for a table built from an approximate
+    index: its rows may be padded only because the probed lists ran out, so
+    any row yielding fewer than top_n results falls back.
+    """
+    ids = neighbour_ids[product_index]
+    valid = ids >= 0
+    complete = exact and not valid.all()
+    ids = ids[valid]
+    scores = neighbour_scores[product_index][valid]
+
+    filters = (price_range, min_rating, connectivity, headphone_type, brand)
+    if not any(filters):
+        if len(ids) >= top_n or complete:
+            return ids[:top_n], scores[:top_n]
+        return None
+
+    mask = build_filter_mask(columns, *filters)
+    passing = mask[ids]
+    accepted = np.flatnonzero(passing)[:top_n]
+    if len(accepted) < top_n and not complete:
+        return None
+
+    # Models skipped before (or tied with) the last accepted neighbour must have no passing variant
+    if len(accepted) == top_n:
+        last = accepted[-1]
+        scanned = last + 1 + np.count_nonzero(scores[last + 1:] >= scores[last])
+    else:
+        scanned = len(ids)
+    rejected = ids[:scanned][~passing[:scanned]]
+    if len(rejected):
+        base_models = columns['base_model']
+        model_passes = np.zeros(base_models.max() + 1, dtype=bool)
+        model_passes[base_models[mask]] = True
+        if model_passes[base_models[rejected]].any():
+            return None
+
+    return ids[accepted], scores[accepted]
@@ -0,0 +1,512 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import issparse
+
+from artifacts import ARTIFACT_ROOT, MANIFEST_FILE, artifact_key, load_or_build, prune_artifacts, save_model
+from catalogue import CatalogueIndex, pipeline_signature, read_catalogue
+from fragments import FragmentCache
+from metrics import CACHE_REQUESTS, CATALOGUE_PRODUCTS, RECOMMENDATION_SECONDS, registry
+from recommender import (
+    SimilarityEngine,
+    batch_recommendations,
+    build_filter_columns,
+    neighbour_recommendations,
+    rank_recommendations,
+)
+from result_cache import MISSING, ResultCache
+from search import SearchIndex
+from updates import apply_delta, needs_refit, refit_model
+
+CATALOGUE_PATH = 'productdata.csv'
+# Record fields copied into each recommendation
+RECOMMENDATION_FIELDS = [
+    'name', 'brand', 'price', 'rating', 'reviews', 'image_url', 'description', 'type',
+    'connectivity', 'battery_life', 'availability', 'loyaltypoints',
+]
+# Filter arguments in the order they appear in a request key
+FILTER_NAMES = ['price_range', 'min_rating', 'connectivity', 'headphone_type', 'brand']
+# Bounds of the recommendation result cache shared by all sessions
+RECOMMENDATION_CACHE_SIZE = 4096
+RECOMMENDATION_CACHE_TTL = 3600.0
+# Products whose card fragments are rendered when resources are built: the ones that appear in
+# the most neighbour lists, so the first requests after a (re)load mostly hit warm fragments
+FRAGMENT_WARM_ROWS = 500
+# Rows identifying a product across catalogue versions, for incremental updates
+DELTA_KEY = 'link'
+# Largest share of the catalogue a file change may touch and still be applied incrementally
+DELTA_MAX_SHARE = 0.25
+
+# Process-wide current resources, shared by every session
+_current = None
+_lock = threading.Lock()
+# Artifact keys with a background refit running
+_refitting = set()
+
+# Recommendation results keyed by request, invalidated whenever the catalogue version changes
+recommendation_cache = ResultCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL)
+
+# Exported gauges read from the state above
+CATALOGUE_PRODUCTS.set_function(lambda: len(_current.df) if _current is not None else 0)
+registry.gauge('soundmatch_result_cache_entries', 'Recommendation results held in the result cache').set_function(
+    lambda: recommendation_cache.stats()['size'])
+
+
+# Mark an array read-only (memory-mapped artifacts already are)
+def freeze(array):
+    array = np.asarray(array)
+    array.setflags(write=False)
+    return array
+
+
+# Up to n products, most often listed as a neighbour first
+def most_recommended(neighbour_ids, n):
+    ids = np.asarray(neighbour_ids).ravel()
+    counts = np.bincount(ids[ids >= 0], minlength=len(neighbour_ids))
+    listed = np.flatnonzero(counts)
+    return listed[np.argsort(-counts[listed], kind='stable')][:n]
+
+
+# Mark the arrays behind a dense or CSR matrix read-only
+def freeze_matrix(matrix):
+    if issparse(matrix):
+        for array in (matrix.data, matrix.indices, matrix.indptr):
+            array.setflags(write=False)
+    else:
+        freeze(matrix)
+    return matrix
+
+
+class _ReadOnlyIndexer:
+    __slots__ = ('_indexer', '_name')
+
+    def __init__(self, indexer, name):
+        self._indexer = indexer
+        self._name = name
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        raise TypeError(f"FrozenFrame is read-only; cannot assign through .{self._name}")
+
+
+class FrozenFrame:
+    """
+    Read-only view of a DataFrame shared between sessions. Reads pass
+    through: columns, iloc/loc/at/iat lookups and DataFrame methods return
+    what the frame would. Assigning or deleting columns, cells or attributes
+    raises, as do the methods that change a frame in place. What a read
+    returns is the caller's own object; with copy-on-write (always on from
+    pandas 3) changing it never reaches the shared frame. copy() gives a
+    writable frame.
+    """
+
+    __slots__ = ('_frame',)
+
+    _INDEXERS = frozenset({'loc', 'iloc', 'at', 'iat'})
+    # Methods that change the frame in place whatever their arguments
+    _MUTATORS = frozenset({'insert', 'pop', 'update'})
+
+    def __init__(self, frame):
+        object.__setattr__(self, '_frame', frame)
+
+    def __getattr__(self, name):
+        if name in self._INDEXERS:
+            return _ReadOnlyIndexer(getattr(self._frame, name), name)
+        if name in self._MUTATORS:
+            raise TypeError(f"FrozenFrame is read-only; {name}() changes the frame in place")
+        attribute = getattr(self._frame, name)
+        if not callable(attribute):
+            return attribute
+
+        def method(*args, **kwargs):
+            if kwargs.get('inplace'):
+                raise TypeError(f"FrozenFrame is read-only; cannot call {name}() with inplace=True")
+            return attribute(*args, **kwargs)
+        return method
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"FrozenFrame is read-only; cannot set {name!r}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"FrozenFrame is read-only; cannot delete {name!r}")
+
+    def __getitem__(self, key):
+        return self._frame[key]
+
+    def __setitem__(self, key, value):
+        raise TypeError("FrozenFrame is read-only; copy() it to assign columns")
+
+    def __delitem__(self, key):
+        raise TypeError("FrozenFrame is read-only; copy() it to delete columns")
+
+    def __len__(self):
+        return len(self._frame)
+
+    def __iter__(self):
+        return iter(self._frame)
+
+    def __contains__(self, key):
+        return key in self._frame
+
+    def __repr__(self):
+        return repr(self._frame)
+
+
+class CatalogueResources:
+    """
+    Everything the app reads from a fitted catalogue: the frame, the
+    similarity engine, the filter columns, the search and name indices, the
+    neighbour table, the option lists the Discover filters are built from,
+    and the cache of rendered product-card fragments, warmed for the
+    FRAGMENT_WARM_ROWS most recommended products.
+
+    One instance is built per catalogue version and shared by every session
+    without copying, so it is immutable: attributes cannot be reassigned, the
+    arrays and the similarity matrix are read-only, and df is the frame
+    behind a FrozenFrame.
+    version identifies the catalogue content and pipeline it was built from.
+    model is the fitted CatalogueModel, kept so file changes can be applied
+    to it incrementally.
+    """
+
+    def __init__(self, model, version, source=None):
+        df = model.df
+        catalogue_index = CatalogueIndex(df, model.descriptions)
+        similarity_engine = SimilarityEngine(model.similarity_features())
+        freeze_matrix(similarity_engine.matrix)
+        fields = {
+            'version': version,
+            'source': source,
+            'model': model,
+            'df': FrozenFrame(df),
+            'similarity_engine': similarity_engine,
+            'filter_columns': {name: freeze(column) for name, column in build_filter_columns(df).items()},
+            'search_index': SearchIndex.from_model(model),
+            'catalogue_index': catalogue_index,
+            'fragments': FragmentCache(catalogue_index),
+            'neighbour_ids': freeze(model.arrays['neighbour_ids']),
+            'neighbour_scores': freeze(model.arrays['neighbour_scores']),
+            'neighbour_exact': model.neighbour_exact,
+            'product_names': tuple(df['name'].astype(str)),
+            'price_bounds': (int(df['price'].min()), int(df['price'].max())),
+            'brands': tuple(sorted(df['brand'].astype(str).unique().tolist())),
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+        self.fragments.warm(most_recommended(self.neighbour_ids, FRAGMENT_WARM_ROWS))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CatalogueResources is immutable; cannot set {name!r}")
+
+    def recommend(self, product_name, top_n=5, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None):
+        """
+        Top N recommendations for a product as a list of dicts: the product's
+        RECOMMENDATION_FIELDS plus 'index' and 'similarity'. Empty if the
+        product is not in the catalogue. Touches no Streamlit state, so it can
+        run on a worker thread.
+
+        Results are served from recommendation_cache when the same request
+        was answered before; the dicts are shared, so treat them as read-only.
+        """
+        with RECOMMENDATION_SECONDS.time():
+            product_index = self.catalogue_index.row_id(product_name)
+            if product_index is None:
+                return []
+
+            key = self.request_key(product_index, top_n, price_range, min_rating, connectivity, headphone_type, brand)
+            recommendations = recommendation_cache.get(self.version, key)
+            CACHE_REQUESTS.inc(cache='result', result='miss' if recommendations is MISSING else 'hit')
+            if recommendations is MISSING:
+                recommendations = self._recommend(*key)
+                recommendation_cache.put(self.version, key, recommendations)
+            return list(recommendations)
+
+    def request_key(self, product_index, top_n=5, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None):
+        """
+        Normalised form of a request, so requests that must give the same
+        answer share a cache entry: a price range covering the whole
+        catalogue is the same as none, a min_rating of 0 the same as None,
+        and numbers are plain ints and floats whatever type they came in.
+        """
+        if price_range:
+            price_range = (float(price_range[0]), float(price_range[1]))
+            if price_range[0] <= self.price_bounds[0] and price_range[1] >= self.price_bounds[1]:
+                price_range = None
+        return (int(product_index), int(top_n), price_range or None, float(min_rating or 0),
+                connectivity or None, headphone_type or None, brand or None)
+
+    def _recommend(self, product_index, top_n, price_range, min_rating, connectivity, headphone_type, brand):
+        filters = dict(
+            price_range=price_range,
+            min_rating=min_rating,
+            connectivity=connectivity,
+            headphone_type=headphone_type,
+            brand=brand
+        )
+
+        # Serve from the precomputed neighbour table when it has the exact answer
+        top = neighbour_recommendations(self.neighbour_ids, self.neighbour_scores, product_index, self.filter_columns, top_n,
+                                        exact=self.neighbour_exact, **filters)
+
+        if top is not None:
+            top_indices, top_scores = top
+        else:
+            # Filter, dedupe by base model and rank over column arrays
+            sim_scores = self.similarity_engine.scores(product_index)
+            top_indices = rank_recommendations(sim_scores, product_index, self.filter_columns, top_n, **filters)
+            top_scores = sim_scores[top_indices]
+
+        return self._materialise(top_indices, top_scores)
+
+    # Only materialise the rows that made the cut
+    def _materialise(self, top_indices, top_scores):
+        recommendations = []
+        for i, score in zip(top_indices, top_scores):
+            record = self.catalogue_index.record(i)
+            recommendation = {'index': int(i)}
+            recommendation.update((field, record[field]) for field in RECOMMENDATION_FIELDS)
+            recommendation['similarity'] = float(score)
+            recommendations.append(recommendation)
+        return recommendations
+
+    def recommend_many(self, product_names, top_n=5, price_range=None, min_rating=0, connectivity=None, headphone_type=None, brand=None):
+        """
+        recommend() for many products sharing the same filters, as a list of
+        result lists in the order of product_names (empty for unknown
+        products). Cached results are reused and the rest are computed in one
+        batch_recommendations() pass, then cached.
+        """
+        results = [[] for _ in product_names]
+        pending = {}
+        for position, name in enumerate(product_names):
+            product_index = self.catalogue_index.row_id(name)
+            if product_index is None:
+                continue
+            key = self.request_key(product_index, top_n, price_range, min_rating, connectivity, headphone_type, brand)
+            cached = recommendation_cache.get(self.version, key)
+            if cached is MISSING:
+                pending.setdefault(key, []).append(position)
+            else:
+                results[position] = list(cached)
+
+        if pending:
+            keys = list(pending)
+            # Every key shares the normalised filters, only the product differs
+            _, top_n, *filters = keys[0]
+            ids, scores = batch_recommendations(self.similarity_engine, [key[0] for key in keys], self.filter_columns, top_n, **dict(zip(FILTER_NAMES, filters)))
+            for key, row_ids, row_scores in zip(keys, ids, scores):
+                found = row_ids >= 0
+                recommendations = self._materialise(row_ids[found], row_scores[found])
+                recommendation_cache.put(self.version, key, recommendations)
+                for position in pending[key]:
+                    results[position] = list(recommendations)
+        return results
+
+    def similar_items(self, top_n=10, block_size=256, **filters):
+        """
+        Top top_n recommendations for every product in the catalogue, as a
+        long DataFrame with one row per (product, rank): product and
+        neighbour row ids, names and links, and the similarity. Meant for
+        offline exports; bypasses the result cache.
+        """
+        ids, scores = batch_recommendations(self.similarity_engine, np.arange(len(self.df)), self.filter_columns, top_n, block_size, **filters)
+        rows, ranks = np.nonzero(ids >= 0)
+        neighbours = ids[rows, ranks]
+        names = self.df['name'].to_numpy()
+        links = self.df['link'].to_numpy()
+        return pd.DataFrame({
+            'product_id': rows,
+            'product_name': names[rows],
+            'product_link': links[rows],
+            'rank': ranks + 1,
+            'neighbour_id': neighbours,
+            'neighbour_name': names[neighbours],
+            'neighbour_link': links[neighbours],
+            'similarity': scores[rows, ranks],
+        })
+
+
+# What a catalogue file looks like on disk; a change means the resources need a reload
+def source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return os.path.abspath(csv_path), stat.st_mtime_ns, stat.st_size
+
+
+# Catalogue version served: the artifact key, marked with the incremental updates since the last full fit
+def resources_version(key, model):
+    updates = model.drift.get('updates', 0)
+    return f"{key}-u{updates}" if updates else key
+
+
+# The artifact key a resources version was loaded from: the version without its update count
+def version_key(version):
+    return re.sub(r'-u\d+$', '', version)
+
+
+def load_resources(csv_path=CATALOGUE_PATH, root=ARTIFACT_ROOT, previous=None):
+    """
+    CatalogueResources for csv_path. Artifacts saved for this exact file are
+    loaded if there are any. Otherwise, given the previous resources, the
+    file's changes are applied to them incrementally (see update_model),
+    and only failing that is the catalogue built from scratch. A background
+    refit is scheduled when the result has drifted too far from its fit.
+    """
+    source = source_stamp(csv_path)
+    key = artifact_key(csv_path)
+    directory = os.path.join(root, key)
+
+    model = None
+    if (previous is not None and previous.version.startswith(pipeline_signature() + '-')
+            and not os.path.exists(os.path.join(directory, MANIFEST_FILE))):
+        model = update_model(previous.model, csv_path, directory, previous.version)
+    if model is None:
+        model = load_or_build(csv_path, root, key=key)
+
+    if needs_refit(model):
+        schedule_refit(model, root, key, source)
+    return CatalogueResources(model, resources_version(key, model), source)
+
+
+def catalogue_delta(model, new_df, max_share=DELTA_MAX_SHARE):
+    """
+    The (upserts, deletes) that turn model's catalogue into new_df, a raw
+    catalogue as read_catalogue returns it: the rows of new_df whose
+    DELTA_KEY is new or whose CSV columns changed, and the keys that are
+    gone. None when the rows cannot be matched up (keys missing or not
+    unique) or the change touches more than max_share of the catalogue.
+    """
+    current = model.df
+    columns = list(new_df.columns)
+    old = {column: current[column] for column in columns if column in current.columns}
+    if 'description' in columns and 'description' not in old and model.descriptions is not None:
+        old['description'] = pd.Series(list(model.descriptions), index=current.index)
+    if DELTA_KEY not in columns or len(old) != len(columns):
+        return None
+
+    old_keys, new_keys = pd.Index(current[DELTA_KEY].astype(str)), pd.Index(new_df[DELTA_KEY].astype(str))
+    if not old_keys.is_unique or not new_keys.is_unique:
+        return None
+
+    # Compare rows by a hash of their CSV columns as text, so dtype differences (categorical, int32) do not count
+    def fingerprint(frame):
+        return pd.util.hash_pandas_object(frame.astype(object).fillna('').astype(str), index=False).to_numpy()
+
+    old_hash = fingerprint(pd.DataFrame(old)[columns])
+    new_hash = fingerprint(new_df[columns])
+    position = old_keys.get_indexer(new_keys)
+    changed = (position < 0) | (old_hash[np.maximum(position, 0)] != new_hash)
+    deletes = old_keys.difference(new_keys)
+
+    if changed.sum() + len(deletes) > max_share * max(len(new_df), 1):
+        return None
+    return new_df[changed], deletes.tolist()
+
+
+def update_model(model, csv_path, directory, base_version=None):
+    """
+    Apply the difference between model's catalogue and the file at csv_path
+    as an incremental update (updates.apply_delta) and save the result to
+    directory, so later loads of the file reuse it. Returns the new model,
+    or None when catalogue_delta() finds the change unsuitable and the file
+    needs a full build.
+    """
+    delta = catalogue_delta(model, read_catalogue(csv_path))
+    if delta is None:
+        return None
+
+    upserts, deletes = delta
+    report = None
+    if len(upserts) or len(deletes):
+        model, report = apply_delta(model, upserts, deletes, key=DELTA_KEY)
+    try:
+        save_model(model, directory, build_info={'base_version': base_version, 'update': report})
+    except OSError:
+        # A read-only filesystem should not stop the update from being served
+        pass
+    return model
+
+
+_refit_lock = threading.Lock()
+
+
+def schedule_refit(model, root, key, source):
+    """
+    Refit model from scratch on a background thread, save it as the
+    artifacts for key and swap it in, unless the catalogue file has changed
+    again by then. At most one refit per key runs at a time.
+    """
+    with _refit_lock:
+        if key in _refitting:
+            return
+        _refitting.add(key)
+    threading.Thread(target=_refit, args=(model, root, key, source), name='catalogue-refit', daemon=True).start()
+
+
+def _refit(model, root, key, source):
+    try:
+        model = refit_model(model)
+        try:
+            save_model(model, os.path.join(root, key), build_info={'refit': True})
+        except OSError:
+            pass
+        resources = CatalogueResources(model, resources_version(key, model), source)
+        with _lock:
+            if _current is not None and _current.source == source:
+                _swap(resources, root)
+    finally:
+        with _refit_lock:
+            _refitting.discard(key)
+
+
+# Make resources the current ones (call with _lock held). Every file change saves a new artifact
+# build, so the builds of older versions are removed; the replaced version's is kept for replicas
+# that have not switched yet.
+def _swap(resources, root):
+    global _current
+    previous, _current = _current, resources
+    if previous is not None:
+        prune_artifacts(root, keep={version_key(resources.version), version_key(previous.version)})
+    return resources
+
+
+def get_resources(csv_path=CATALOGUE_PATH, root=ARTIFACT_ROOT):
+    """
+    The shared CatalogueResources for csv_path, built on first use.
+
+    Each call costs one stat() of the file. When the file has changed, the
+    first caller to notice loads the new version (applying small changes
+    incrementally, see load_resources) and swaps it in; callers arriving
+    meanwhile keep getting the previous version rather than waiting, and
+    sessions still holding it finish their rerun on it undisturbed.
+    """
+    source = source_stamp(csv_path)
+    current = _current
+    if current is not None and current.source == source:
+        CACHE_REQUESTS.inc(cache='data', result='hit')
+        return current
+
+    # Only the very first load has nothing to fall back on and has to wait
+    if not _lock.acquire(blocking=current is None):
+        CACHE_REQUESTS.inc(cache='data', result='hit')
+        return current
+    try:
+        if _current is None or _current.source != source:
+            CACHE_REQUESTS.inc(cache='data', result='miss')
+            _swap(load_resources(csv_path, root, previous=_current), root)
+        else:
+            CACHE_REQUESTS.inc(cache='data', result='hit')
+        return _current
+    finally:
+        _lock.release()
+
+
+# Reload the resources for csv_path now and swap them in, e.g. after replacing the file in place.
+# The change is applied incrementally when possible; full=True skips that and loads or builds the file as is.
+def reload_resources(csv_path=CATALOGUE_PATH, root=ARTIFACT_ROOT, full=False):
+    with _lock:
+        return _swap(load_resources(csv_path, root, previous=None if full else _current), root)
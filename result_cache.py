@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by ResultCache.get() when nothing usable is cached
+MISSING = object()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a time-to-live, shared by every session.
+
+    Entries belong to one data version (e.g. the catalogue's artifact key):
+    the first get() or put() for a different version drops everything cached
+    for the old one. At most maxsize entries are kept, the least recently
+    used going first, and an entry older than ttl seconds counts as a miss.
+    Cached values are shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    # Drop the entries of another data version; call with the lock held
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self._counters['invalidations'] += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return MISSING
+            stored, value = entry
+            if time.monotonic() - stored > self.ttl:
+                del self._entries[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+
+    def put(self, version, key, value):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Counters since start-up plus the current size and hit rate
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, size=len(self._entries), maxsize=self.maxsize, version=self.version)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
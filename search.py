@@ -0,0 +1,81 @@
+import re
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class SearchIndex:
+    """
+    Inverted index over the catalogue's TF-IDF matrix.
+
+    Each column of the CSC matrix is a term's posting list (product indices
+    with their TF-IDF weights), so a query only touches the postings of its
+    own terms. Terms are kept sorted so a prefix typed so far maps to one
+    contiguous block of postings.
+    """
+
+    def __init__(self, term_matrix, vocabulary, stop_words=()):
+        # Columns are reordered into sorted term order so a prefix is one contiguous range
+        terms = np.asarray(vocabulary, dtype=str)
+        order = np.argsort(terms)
+        self.sorted_terms = terms[order]
+        self.term_ids = {term: i for i, term in enumerate(self.sorted_terms)}
+        self.stop_words = frozenset(stop_words)
+
+        self.postings = csc_matrix(term_matrix)[:, order]
+        self.n_docs = self.postings.shape[0]
+
+    @classmethod
+    def from_model(cls, model):
+        vocabulary = model.tfidf.get_feature_names_out()
+        term_matrix = model.feature_matrix[:, :len(vocabulary)]
+        return cls(term_matrix, vocabulary, model.tfidf.get_stop_words() or ())
+
+    # Lowercased word tokens, without stop words except for the token still being typed
+    def tokenize(self, query, prefix=False):
+        tokens = TOKEN_PATTERN.findall(str(query).lower())
+        last = len(tokens) - 1
+        return [(token, prefix and i == last) for i, token in enumerate(tokens)
+                if (prefix and i == last) or (token not in self.stop_words and len(token) > 1)]
+
+    # Column range of the term matching a token exactly, or of every term starting with it
+    def expand(self, token, prefix=False):
+        if not prefix:
+            term_id = self.term_ids.get(token)
+            return (0, 0) if term_id is None else (term_id, term_id + 1)
+        lo = np.searchsorted(self.sorted_terms, token, side='left')
+        hi = np.searchsorted(self.sorted_terms, token + '\U0010ffff', side='left')
+        return lo, hi
+
+    # Documents and weights in the posting lists of a column range
+    def postings_for(self, term_range):
+        start, end = self.postings.indptr[term_range[0]], self.postings.indptr[term_range[1]]
+        return self.postings.indices[start:end], self.postings.data[start:end]
+
+    def search(self, query, operator='and', prefix=True, limit=None):
+        """
+        Product indices matching query, best first. With operator='and' every
+        query token must match; with 'or' any token may. When prefix is True
+        the last token matches any term it is a prefix of. Returns None when
+        the query has no searchable tokens.
+        """
+        tokens = self.tokenize(query, prefix)
+        if not tokens:
+            return None
+
+        scores = np.zeros(self.n_docs)
+        matched = np.zeros(self.n_docs, dtype=np.int32)
+        for token, is_prefix in tokens:
+            docs, weights = self.postings_for(self.expand(token, is_prefix))
+            scores += np.bincount(docs, weights=weights, minlength=self.n_docs)
+            matched += np.bincount(docs, minlength=self.n_docs) > 0
+
+        if operator == 'and':
+            hits = np.flatnonzero(matched == len(tokens))
+        else:
+            hits = np.flatnonzero(matched > 0)
+
+        ranked = hits[np.lexsort((hits, -scores[hits]))]
+        return ranked if limit is None else ranked[:limit]
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STYLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'styles')
+# Stylesheets of each theme, in cascade order
+STYLESHEETS = {
+    'light': ('app.css',),
+    'dark': ('app.css', 'app-dark.css'),
+}
+# Port the stylesheet server listens on, and the base URL browsers reach it at (the server itself, a
+# reverse proxy in front of it or a CDN using it as origin). Unset, the stylesheets are inlined
+STYLE_PORT_ENV = 'SOUNDMATCH_STYLE_PORT'
+STYLE_URL_ENV = 'SOUNDMATCH_STYLE_URL'
+# Unlike the metrics server this one is for browsers, so it listens on every interface
+STYLE_HOST = '0.0.0.0'
+STYLE_PATH = '/styles/'
+CSS_CONTENT_TYPE = 'text/css; charset=utf-8'
+# A URL names one version of a file, so browsers and CDNs may keep it for good
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+VERSIONED_NAME = re.compile(r'^([\w-]+)\.([0-9a-f]{12})\.css$')
+
+
+@lru_cache(maxsize=None)
+def _read_stylesheet(path, mtime_ns, size):
+    with open(path, encoding='utf-8') as f:
+        css = f.read()
+    return hashlib.sha256(css.encode()).hexdigest()[:12], css
+
+
+# (content hash, text) of a stylesheet; the file is read again only when it changes on disk
+def read_stylesheet(filename, style_dir=STYLE_DIR):
+    path = os.path.join(style_dir, filename)
+    stat = os.stat(path)
+    return _read_stylesheet(path, stat.st_mtime_ns, stat.st_size)
+
+
+# URL of the current version of a stylesheet: the content hash is part of the file name
+def stylesheet_url(filename, base_url, style_dir=STYLE_DIR):
+    version, _ = read_stylesheet(filename, style_dir)
+    stem, ext = os.path.splitext(filename)
+    return f"{base_url.rstrip('/')}{STYLE_PATH}{stem}.{version}{ext}"
+
+
+@lru_cache(maxsize=16)
+def _style_block(versions, sheets):
+    css = '\n'.join(sheets)
+    return f'<style data-version="{"-".join(versions)}">\n{css}\n</style>'
+
+
+@lru_cache(maxsize=16)
+def _link_tags(urls):
+    return '\n'.join(f'<link rel="stylesheet" href="{url}">' for url in urls)
+
+
+def stylesheet(theme='light', style_dir=STYLE_DIR, base_url=None):
+    """
+    Markup applying the app's stylesheets for the given theme. With a
+    base_url it is one <link> per file to its versioned URL under base_url
+    (see StylesheetHandler), a few hundred bytes the browser resolves from
+    its cache; without one, the files inlined as one <style> block.
+    Either is built once per combination of file contents and reused by
+    every rerun and session, so a rerun only stats the files.
+    """
+    if theme not in STYLESHEETS:
+        raise ValueError(f"Unknown theme: {theme}")
+    if base_url:
+        return _link_tags(tuple(stylesheet_url(name, base_url, style_dir) for name in STYLESHEETS[theme]))
+    versions, sheets = zip(*(read_stylesheet(name, style_dir) for name in STYLESHEETS[theme]))
+    return _style_block(versions, sheets)
+
+
+class StylesheetHandler(BaseHTTPRequestHandler):
+    """
+    Serves /styles/<name>.<hash>.css: the current version of one of the
+    STYLESHEETS files, as text/css with long-lived cache headers. Other
+    names, and versions the file no longer has, are not found.
+    """
+
+    style_dir = STYLE_DIR
+    filenames = frozenset(name for names in STYLESHEETS.values() for name in names)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        match = VERSIONED_NAME.match(path[len(STYLE_PATH):]) if path.startswith(STYLE_PATH) else None
+        filename = match and f'{match.group(1)}.css'
+        if filename not in self.filenames:
+            self.send_error(404)
+            return
+        version, css = read_stylesheet(filename, self.style_dir)
+        if version != match.group(2):
+            self.send_error(404)
+            return
+
+        etag = f'"{version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', CACHE_CONTROL)
+            self.end_headers()
+            return
+        body = css.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CSS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        self.send_header('ETag', etag)
+        self.send_header('X-Content-Type-Options', 'nosniff')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stylesheet_server(port, host=STYLE_HOST):
+    """Serve the stylesheets on a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), StylesheetHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stylesheet-server', daemon=True).start()
+    return server
+
+
+_base_url = None
+_serving = False
+_serve_lock = threading.Lock()
+
+
+def start_stylesheet_export():
+    """
+    Start the stylesheet server configured by SOUNDMATCH_STYLE_PORT, once
+    per process, and return the base URL to link the stylesheets from:
+    SOUNDMATCH_STYLE_URL, else http://localhost:<port>, else None when
+    neither is set (the stylesheets are then inlined).
+    """
+    global _base_url, _serving
+    with _serve_lock:
+        if not _serving:
+            _serving = True
+            port = os.environ.get(STYLE_PORT_ENV)
+            if port:
+                try:
+                    start_stylesheet_server(int(port))
+                except ValueError:
+                    port = None
+                except OSError:
+                    # Another replica on this host holds the port and serves the same files
+                    pass
+            _base_url = os.environ.get(STYLE_URL_ENV) or (f'http://localhost:{port}' if port else None)
+        return _base_url
@@ -0,0 +1,200 @@
+"""
+Synthetic catalogues with the productdata.csv schema, for load testing:
+
+    python synthetic.py --rows 1000000 --out synthetic.csv --seed 0
+
+Distributions come from a real catalogue: each synthetic product model copies
+the category, brand, name wording and image of a random real row, gets a
+fresh model code so it is a new base model, and has its price, rating and
+reviews jittered around the real row's. Descriptions are drawn from the word
+frequencies of the real descriptions in the same category. Models get
+"(Colour)" variants as often, and in groups as large, as in the real file.
+
+Rows are generated and written chunk by chunk, so memory stays bounded by the
+chunk size whatever the number of rows. The same source, seed and chunk size
+always produce the same file.
+"""
+import argparse
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from catalogue import CHUNK_ROWS, extract_base_model, read_catalogue
+from fileio import atomic_write
+
+SOURCE_CSV = 'productdata.csv'
+COLUMNS = ['name', 'brand', 'price', 'rating', 'reviews', 'link', 'category', 'image_url', 'description',
+           'availability', 'loyaltypoints']
+SYNTHETIC_LINK = 'https://www.example.com/dp/SYN{seed}-{row:09d}'
+# Colours used on top of those found in the real names
+BASE_COLOURS = ['Black', 'White', 'Blue', 'Grey', 'Silver', 'Red', 'Green', 'Beige', 'Navy', 'Pink']
+# Real prices are scaled by exp(N(0, PRICE_SPREAD)) so products spread around their template's price
+PRICE_SPREAD = 0.25
+WORD_PATTERN = re.compile(r'[A-Za-z][A-Za-z0-9\-]+')
+COLOUR_PATTERN = re.compile(r'^[A-Z][a-z]+(?: [A-Z][a-z]+){0,2}$')
+
+
+class CatalogueProfile:
+    """
+    What the generator samples from, taken from a real catalogue: the rows
+    used as templates, the description vocabulary of each category, the
+    colour names and the distribution of variant group sizes.
+    """
+
+    def __init__(self, df):
+        df = df.reset_index(drop=True)
+        names = df['name'].astype(str)
+        base_names = extract_base_model(names)
+
+        self.categories = df['category'].astype(str).to_numpy()
+        self.brands = df['brand'].astype(str).to_numpy()
+        self.base_names = base_names.to_numpy()
+        self.image_urls = df['image_url'].astype(str).to_numpy()
+        self.prices = df['price'].to_numpy(dtype=np.float64)
+        self.ratings = df['rating'].to_numpy(dtype=np.float64)
+        self.reviews = df['reviews'].to_numpy(dtype=np.float64)
+        self.availability = df['availability'].to_numpy(dtype=np.int64)
+        self.description_lengths = df['description'].astype(str).str.split().str.len().to_numpy()
+
+        # Per-category word frequencies of the descriptions
+        self.vocabulary = {}
+        for category, descriptions in df['description'].astype(str).groupby(self.categories):
+            words = pd.Series(WORD_PATTERN.findall(' '.join(descriptions))).value_counts()
+            self.vocabulary[category] = (words.index.to_numpy(), (words / words.sum()).to_numpy())
+
+        # Colours: the first part of a variant name's parentheses when it looks like one
+        found = names.str.extract(r'\(([^,()|/]+)', expand=False).dropna().str.strip()
+        colours = found[found.str.match(COLOUR_PATTERN)].unique().tolist()
+        self.colours = np.array(sorted(set(colours) | set(BASE_COLOURS)))
+
+        # Share of models sold in variants, and the sizes of their variant groups
+        has_variant = names.str.contains('(', regex=False)
+        group_sizes = base_names[has_variant].value_counts().to_numpy()
+        self.variant_share = len(group_sizes) / (len(group_sizes) + int((~has_variant).sum()))
+        self.variant_sizes = np.minimum(group_sizes, len(self.colours)) if len(group_sizes) else np.ones(1, dtype=np.int64)
+
+    @classmethod
+    def from_csv(cls, path=SOURCE_CSV):
+        return cls(read_catalogue(path))
+
+    def __len__(self):
+        return len(self.categories)
+
+
+# Model code unique to a model number: A100, B100, ..., Z100, A101, ...
+def model_codes(model_ids):
+    model_ids = np.asarray(model_ids)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))[model_ids % 26]
+    return np.char.add(letters, (model_ids // 26 + 100).astype(str))
+
+
+# Insert a model code after the first word of each template name
+def model_names(base_names, codes):
+    parts = pd.Series(base_names).str.split(' ', n=1)
+    head, tail = parts.str[0], parts.str[1].fillna('')
+    return (head + ' ' + pd.Series(codes) + ' ' + tail).str.strip().to_numpy()
+
+
+def _descriptions(profile, rng, categories, lengths):
+    descriptions = np.empty(len(categories), dtype=object)
+    for category in np.unique(categories):
+        rows = np.flatnonzero(categories == category)
+        words, probabilities = profile.vocabulary[category]
+        drawn = words[rng.choice(len(words), size=int(lengths[rows].sum()), p=probabilities)]
+        for row, text in zip(rows, np.split(drawn, np.cumsum(lengths[rows])[:-1])):
+            descriptions[row] = ' '.join(text)
+    return descriptions
+
+
+def generate_chunk(profile, rng, n_rows, first_row=0, first_model=0, seed=0):
+    """
+    n_rows synthetic rows as a DataFrame with the catalogue's columns, and
+    the number of product models they span. Row and model numbering start at
+    first_row and first_model so links and model codes stay unique across
+    chunks.
+    """
+    # Variant group size of each model, drawn until the chunk is full; the last group may be cut short
+    sizes = np.ones(n_rows, dtype=np.int64)
+    varied = rng.random(n_rows) < profile.variant_share
+    sizes[varied] = rng.choice(profile.variant_sizes, size=int(varied.sum()))
+    n_models = int(np.searchsorted(np.cumsum(sizes), n_rows)) + 1
+    sizes, varied = sizes[:n_models], varied[:n_models]
+    sizes[-1] -= sizes.sum() - n_rows
+
+    # Model-level attributes, copied from a template row and jittered
+    templates = rng.integers(0, len(profile), n_models)
+    categories = profile.categories[templates]
+    prices = np.maximum(1, np.round(profile.prices[templates] * np.exp(rng.normal(0, PRICE_SPREAD, n_models))))
+    ratings = np.clip(profile.ratings[templates] + rng.choice([-0.2, -0.1, 0.0, 0.1, 0.2], n_models), 0.0, 5.0).round(1)
+    reviews = np.floor(profile.reviews[templates] * rng.uniform(0.5, 1.5, n_models))
+    lengths = profile.description_lengths[rng.integers(0, len(profile), n_models)]
+    names = model_names(profile.base_names[templates], model_codes(first_model + np.arange(n_models)))
+    descriptions = _descriptions(profile, rng, categories, lengths)
+
+    # Expand models to rows; variants take consecutive colours from a random start, so they are distinct
+    model = np.repeat(np.arange(n_models), sizes)
+    variant = np.arange(n_rows) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    colour_start = rng.integers(0, len(profile.colours), n_models)
+    colours = profile.colours[(colour_start[model] + variant) % len(profile.colours)]
+    row_names = np.where(varied[model], np.char.add(np.char.add(names[model].astype(str), ' ('), np.char.add(colours, ')')),
+                         names[model])
+
+    price = prices[model].astype(np.int64)
+    chunk = pd.DataFrame({
+        'name': row_names,
+        'brand': profile.brands[templates][model],
+        'price': price,
+        'rating': ratings[model],
+        'reviews': reviews[model].astype(np.int64),
+        'link': [SYNTHETIC_LINK.format(seed=seed, row=row) for row in range(first_row, first_row + n_rows)],
+        'category': categories[model],
+        'image_url': profile.image_urls[templates][model],
+        'description': descriptions[model],
+        'availability': profile.availability[rng.integers(0, len(profile), n_rows)],
+        'loyaltypoints': price // 10,
+    }, columns=COLUMNS)
+    return chunk, n_models
+
+
+def iter_synthetic_chunks(profile, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most chunk_rows synthetic rows, n_rows in total."""
+    rng = np.random.default_rng(seed)
+    first_model = 0
+    for first_row in range(0, n_rows, chunk_rows):
+        chunk, n_models = generate_chunk(profile, rng, min(chunk_rows, n_rows - first_row), first_row, first_model, seed)
+        first_model += n_models
+        yield chunk
+
+
+def write_synthetic_catalogue(path, n_rows, source=SOURCE_CSV, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Write n_rows synthetic products to path as CSV, one chunk at a time. The
+    file is written under a temporary name and moved into place once
+    complete. source is a real catalogue path or a CatalogueProfile.
+    """
+    profile = source if isinstance(source, CatalogueProfile) else CatalogueProfile.from_csv(source)
+    with atomic_write(path, newline='', encoding='utf-8') as f:
+        f.write(','.join(COLUMNS) + '\n')
+        for chunk in iter_synthetic_chunks(profile, n_rows, seed, chunk_rows):
+            chunk.to_csv(f, header=False, index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, required=True, help='number of products to generate')
+    parser.add_argument('--out', required=True, help='CSV file to write')
+    parser.add_argument('--source', default=SOURCE_CSV, help='real catalogue the distributions come from')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows generated and written at a time')
+    args = parser.parse_args(argv)
+
+    write_synthetic_catalogue(args.out, args.rows, args.source, args.seed, args.chunk_rows)
+    print(f"Wrote {args.rows} rows to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
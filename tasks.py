@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads shared by every session; bounds how much recommendation work runs at once
+TASK_WORKERS = 4
+
+_executor = None
+_lock = threading.Lock()
+
+
+# The process-wide worker pool, created on first use
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix='recommend')
+        return _executor
+
+
+class LatestTask:
+    """
+    The most recent background call made on behalf of one session.
+
+    submit() with the same request key as the current call returns its
+    future again, so reruns that do not change the request do not repeat the
+    work. A different key supersedes the current call: if it has not started
+    it is cancelled, and if it is already running its result is simply never
+    read. Rapid changes therefore leave at most one call per session in the
+    queue instead of a backlog. A running call cannot be interrupted: it
+    keeps its worker until it returns.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.future = None
+
+    def submit(self, key, fn, *args, **kwargs):
+        if self.future is not None and key == self.key and self._reusable():
+            return self.future
+        self.cancel()
+        self.key = key
+        self.future = executor().submit(fn, *args, **kwargs)
+        return self.future
+
+    # Calls that were cancelled or failed are run again rather than reused
+    def _reusable(self):
+        if not self.future.done():
+            return True
+        return not self.future.cancelled() and self.future.exception() is None
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+        self.key = None
+        self.future = None
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from catalogue import build_catalogue, read_catalogue
+from recommender import SimilarityEngine, build_filter_columns
+
+CATALOGUE_PATH = 'productdata.csv'
+# Products each equivalence test queries, drawn at random from the catalogue
+SAMPLE_SIZE = 150
+# Filter combinations the fast paths are checked under
+FILTER_SETS = [
+    {},
+    {'price_range': (500, 3000)},
+    {'min_rating': 4.0},
+    {'connectivity': 'Wireless'},
+    {'brand': 'Samsung'},
+    {'price_range': (300, 5000), 'min_rating': 3.5, 'connectivity': 'Wireless'},
+]
+
+
+@pytest.fixture(scope='session')
+def raw_catalogue():
+    return read_catalogue(CATALOGUE_PATH)
+
+
+@pytest.fixture(scope='session')
+def model():
+    return build_catalogue(CATALOGUE_PATH)
+
+
+@pytest.fixture(scope='session')
+def engine(model):
+    return SimilarityEngine(model.similarity_features())
+
+
+@pytest.fixture(scope='session')
+def columns(model):
+    return build_filter_columns(model.df)
+
+
+@pytest.fixture(scope='session')
+def sample(model):
+    return np.random.default_rng(0).choice(len(model.df), SAMPLE_SIZE, replace=False)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalogue import DescriptionSpool, concat_chunks, enrich_catalogue, ingest_catalogue, iter_catalogue_chunks
+from conftest import CATALOGUE_PATH
+
+
+# Small chunks, so categories differ between chunks and some integer columns come back as floats
+@pytest.mark.parametrize('chunksize', [50, 400])
+def test_ingest_matches_in_memory_concat(chunksize):
+    expected = concat_chunks([enrich_catalogue(chunk) for chunk in iter_catalogue_chunks(CATALOGUE_PATH, chunksize)])
+    df, descriptions = ingest_catalogue(CATALOGUE_PATH, chunksize, lazy_descriptions=False)
+    assert descriptions is None
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_lazy_descriptions_are_memory_mapped():
+    eager, _ = ingest_catalogue(CATALOGUE_PATH, 200, lazy_descriptions=False)
+    df, descriptions = ingest_catalogue(CATALOGUE_PATH, 200)
+    assert 'description' not in df
+    assert isinstance(descriptions.data, np.memmap)
+    assert list(descriptions) == eager['description'].astype(str).tolist()
+    pd.testing.assert_frame_equal(df, eager.drop(columns=['description']))
+
+
+def test_empty_spool():
+    spool = DescriptionSpool()
+    spool.append(['', ''])
+    descriptions = spool.finish()
+    assert list(descriptions) == ['', '']
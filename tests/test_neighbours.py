@@ -0,0 +1,111 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ann import IVFIndex
+from artifacts import load_model, save_model
+from catalogue import add_neighbour_table, neighbour_backend, pipeline_signature
+from conftest import FILTER_SETS
+from recommender import NEIGHBOUR_K, build_neighbour_table, neighbour_recommendations, rank_recommendations
+from resources import CatalogueResources
+
+
+@pytest.fixture(scope='session')
+def approximate_table(model, engine):
+    # One probed list per query: the least accurate table the index builds
+    base_models = pd.factorize(model.df['base_model'])[0]
+    return build_neighbour_table(engine, base_models, ann_index=IVFIndex(engine, n_probe=1))
+
+
+@pytest.mark.parametrize('filters', FILTER_SETS)
+@pytest.mark.parametrize('top_n', [5, 20])
+def test_exact_table_matches_full_scan(model, engine, columns, sample, filters, top_n):
+    ids, scores = model.arrays['neighbour_ids'], model.arrays['neighbour_scores']
+    for product in sample:
+        top = neighbour_recommendations(ids, scores, product, columns, top_n, **filters)
+        if not filters:
+            assert top is not None
+        if top is None:
+            continue
+        product_scores = engine.scores(product)
+        expected = rank_recommendations(product_scores, product, columns, top_n, **filters)
+        np.testing.assert_array_equal(top[0], expected)
+        np.testing.assert_allclose(top[1], product_scores[expected], rtol=1e-5)
+
+
+def test_exact_table_matches_neighbour_lists(model, engine, columns):
+    ids = model.arrays['neighbour_ids']
+    for product in range(0, len(model.df), 50):
+        expected = rank_recommendations(engine.scores(product), product, columns, NEIGHBOUR_K)
+        np.testing.assert_array_equal(ids[product][ids[product] >= 0], expected)
+
+
+def test_approximate_table_short_rows_fall_back(approximate_table, columns, sample):
+    ids, scores = approximate_table
+    short = 0
+    for product in sample:
+        for filters in FILTER_SETS:
+            top = neighbour_recommendations(ids, scores, product, columns, 5, exact=False, **filters)
+            if top is None:
+                short += 1
+                continue
+            assert len(top[0]) == 5
+    assert short > 0
+
+
+def test_approximate_resources_return_full_results(model, engine, columns, sample, approximate_table):
+    approximate = copy.copy(model)
+    approximate.arrays = dict(model.arrays, neighbour_ids=approximate_table[0], neighbour_scores=approximate_table[1])
+    approximate.neighbour_exact = False
+    resources = CatalogueResources(approximate, 'approximate')
+
+    for product in sample:
+        for filters in FILTER_SETS:
+            expected = rank_recommendations(engine.scores(product), product, columns, 5, **filters)
+            recommendations = resources._recommend(*resources.request_key(product, 5, **filters))
+            assert len(recommendations) == len(expected)
+
+
+def test_neighbour_exact_is_saved(model, tmp_path):
+    approximate = copy.copy(model)
+    approximate.neighbour_exact = False
+    save_model(approximate, str(tmp_path / 'approximate'))
+    save_model(model, str(tmp_path / 'exact'))
+    assert load_model(str(tmp_path / 'approximate')).neighbour_exact is False
+    assert load_model(str(tmp_path / 'exact')).neighbour_exact is True
+
+
+def test_ivf_search_probes_more_lists_to_fill_k(engine):
+    index = IVFIndex(engine, n_probe=1)
+    for product in range(0, len(engine), 100):
+        ids, scores = index.search(product, 4 * NEIGHBOUR_K)
+        assert len(ids) == 4 * NEIGHBOUR_K
+        assert product not in ids
+
+
+def test_approximate_table_rows_are_full(approximate_table):
+    assert (approximate_table[0] >= 0).all()
+
+
+@pytest.mark.parametrize('backend, exact_limit, exact', [
+    ('auto', None, True),
+    ('auto', 100, False),
+    ('exact', 100, True),
+    ('ivf', None, False),
+])
+def test_add_neighbour_table_backends(model, backend, exact_limit, exact):
+    built = copy.copy(model)
+    built.arrays = dict(model.arrays)
+    add_neighbour_table(built, backend=backend, exact_limit=exact_limit)
+    assert built.neighbour_exact is exact
+    assert neighbour_backend(len(model.df), backend, exact_limit) == ('exact' if exact else 'ivf')
+    if exact:
+        np.testing.assert_array_equal(built.arrays['neighbour_ids'], model.arrays['neighbour_ids'])
+
+
+def test_neighbour_settings_change_the_pipeline_signature():
+    signatures = {pipeline_signature(), pipeline_signature(neighbours='ivf'), pipeline_signature(exact_limit=10),
+                  pipeline_signature(n_probe=2)}
+    assert len(signatures) == 4
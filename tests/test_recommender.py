@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from conftest import FILTER_SETS
+from recommender import batch_recommendations, rank_recommendations
+
+
+@pytest.mark.parametrize('filters', FILTER_SETS)
+@pytest.mark.parametrize('top_n', [1, 5, 20])
+def test_batch_matches_rank_recommendations(engine, columns, sample, filters, top_n):
+    ids, scores = batch_recommendations(engine, sample, columns, top_n, block_size=64, **filters)
+
+    assert ids.shape == scores.shape == (len(sample), top_n)
+    for row, product in enumerate(sample):
+        product_scores = engine.scores(product)
+        expected = rank_recommendations(product_scores, product, columns, top_n, **filters)
+        found = ids[row][ids[row] >= 0]
+        np.testing.assert_array_equal(found, expected)
+        np.testing.assert_allclose(scores[row][:len(found)], product_scores[expected])
+        assert np.isnan(scores[row][len(found):]).all()
+
+
+def test_batch_is_independent_of_block_size(engine, columns, sample):
+    small = batch_recommendations(engine, sample, columns, 5, block_size=7)
+    large = batch_recommendations(engine, sample, columns, 5, block_size=len(sample))
+    np.testing.assert_array_equal(small[0], large[0])
+    np.testing.assert_array_equal(small[1], large[1])
+
+
+def test_batch_with_no_passing_products(engine, columns, sample):
+    ids, scores = batch_recommendations(engine, sample, columns, 5, brand='No such brand')
+    assert (ids == -1).all()
+    assert np.isnan(scores).all()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from resources import CatalogueResources
+
+
+@pytest.fixture(scope='module')
+def resources(model):
+    return CatalogueResources(model, 'test')
+
+
+def test_frame_reads_pass_through(resources, model):
+    assert len(resources.df) == len(model.df)
+    assert 'price' in resources.df
+    assert resources.df['price'].equals(model.df['price'])
+    assert resources.df.iloc[3]['name'] == model.df.iloc[3]['name']
+    assert resources.df.loc[3, 'name'] == model.df.loc[3, 'name']
+    assert resources.df.shape == model.df.shape
+    assert resources.df.sort_values('price').iloc[0]['price'] == model.df['price'].min()
+
+
+@pytest.mark.parametrize('write', [
+    lambda df: df.__setitem__('price', 0),
+    lambda df: df.__delitem__('price'),
+    lambda df: df.loc.__setitem__((0, 'price'), 0),
+    lambda df: df.iloc.__setitem__((0, 0), 'x'),
+    lambda df: df.at.__setitem__((0, 'price'), 0),
+    lambda df: df.insert(0, 'extra', 0),
+    lambda df: df.pop('price'),
+    lambda df: df.fillna(0, inplace=True),
+    lambda df: df.drop(index=[0], inplace=True),
+])
+def test_frame_writes_raise(resources, write):
+    with pytest.raises(TypeError):
+        write(resources.df)
+
+
+def test_frame_attributes_cannot_be_set(resources):
+    with pytest.raises(AttributeError):
+        resources.df.columns = list(range(resources.df.shape[1]))
+
+
+def test_changing_reads_leaves_the_frame_alone(resources, model):
+    before = model.df['price'].to_numpy().copy()
+    prices = resources.df['price']
+    prices.iloc[0] = -1
+    copied = resources.df.copy()
+    copied.loc[1, 'price'] = -1
+    np.testing.assert_array_equal(model.df['price'].to_numpy(), before)
+
+
+def test_arrays_are_read_only(resources):
+    matrix = resources.similarity_engine.matrix
+    for array in (matrix.data, matrix.indices, matrix.indptr, resources.neighbour_ids, resources.filter_columns['price']):
+        assert not array.flags.writeable
+    with pytest.raises(AttributeError):
+        resources.version = 'other'
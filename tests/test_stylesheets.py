@@ -0,0 +1,49 @@
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from stylesheets import CACHE_CONTROL, STYLESHEETS, read_stylesheet, start_stylesheet_server, stylesheet
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = start_stylesheet_server(0, host='127.0.0.1')
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(url, headers=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as response:
+            return response.status, response.headers, response.read().decode()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, ''
+
+
+@pytest.mark.parametrize('theme', sorted(STYLESHEETS))
+def test_linked_stylesheets_are_served_as_cacheable_css(base_url, theme):
+    markup = stylesheet(theme, base_url=base_url)
+    urls = re.findall(r'<link rel="stylesheet" href="([^"]+)">', markup)
+    assert len(urls) == len(STYLESHEETS[theme])
+    assert len(markup) < 500
+    for name, url in zip(STYLESHEETS[theme], urls):
+        status, headers, body = fetch(url)
+        assert status == 200
+        assert headers['Content-Type'] == 'text/css; charset=utf-8'
+        assert headers['Cache-Control'] == CACHE_CONTROL
+        assert body == read_stylesheet(name)[1]
+        assert fetch(url, {'If-None-Match': headers['ETag']})[0] == 304
+
+
+@pytest.mark.parametrize('path', ['/styles/app.000000000000.css', '/styles/other.000000000000.css', '/styles/app.css',
+                                  '/metrics', '/styles/../stylesheets.py'])
+def test_unknown_stylesheets_are_not_found(base_url, path):
+    assert fetch(base_url + path)[0] == 404
+
+
+def test_without_base_url_the_stylesheets_are_inlined():
+    markup = stylesheet('dark')
+    assert markup.startswith('<style') and all(read_stylesheet(name)[1] in markup for name in STYLESHEETS['dark'])
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import resources
+from recommender import SimilarityEngine, build_neighbour_table
+from resources import DELTA_KEY, catalogue_delta, load_resources
+from updates import apply_delta
+
+
+# A small file change: prices of some products raised, one renamed, some removed and copies of others added
+def edited_catalogue(raw):
+    edited = raw.copy()
+    rows = np.random.default_rng(1).choice(len(raw), 12, replace=False)
+    repriced, renamed, deleted, copied = rows[:5], rows[5], rows[6:9], rows[9:]
+    edited.loc[repriced, 'price'] = (edited.loc[repriced, 'price'] * 1.5).astype(edited['price'].dtype)
+    edited.loc[renamed, 'name'] = edited.loc[renamed, 'name'] + ' Pro'
+    added = raw.iloc[copied].copy()
+    added[DELTA_KEY] = added[DELTA_KEY] + '?variant=2'
+    added['name'] = added['name'] + ' (Limited Edition)'
+    edited = pd.concat([edited.drop(index=deleted), added], ignore_index=True)
+    return edited, raw[DELTA_KEY].iloc[deleted].tolist()
+
+
+def rebuilt_table(model):
+    engine = SimilarityEngine(model.similarity_features())
+    return build_neighbour_table(engine, pd.factorize(model.df['base_model'])[0])
+
+
+def assert_same_table(model, expected):
+    np.testing.assert_array_equal(model.arrays['neighbour_ids'], expected[0])
+    np.testing.assert_allclose(model.arrays['neighbour_scores'], expected[1], rtol=1e-5, equal_nan=True)
+
+
+def test_catalogue_delta_finds_the_changes(model, raw_catalogue):
+    edited, deleted = edited_catalogue(raw_catalogue)
+    upserts, deletes = catalogue_delta(model, edited)
+    assert sorted(deletes) == sorted(deleted)
+    assert len(upserts) == 9
+
+
+def test_catalogue_delta_refuses_large_changes(model, raw_catalogue):
+    edited = raw_catalogue.copy()
+    edited['price'] = edited['price'] + 1
+    assert catalogue_delta(model, edited) is None
+
+
+def test_update_neighbour_table_matches_rebuild(model, raw_catalogue):
+    upserts, deletes = catalogue_delta(model, edited_catalogue(raw_catalogue)[0])
+    updated, report = apply_delta(model, upserts, deletes, key=DELTA_KEY)
+
+    assert len(updated.df) == len(model.df)
+    assert 0 < report['neighbour_rows_recomputed'] < len(updated.df)
+    assert_same_table(updated, rebuilt_table(updated))
+
+
+def test_update_leaves_the_input_model_untouched(model, raw_catalogue):
+    before = model.arrays['neighbour_ids'].copy()
+    upserts, deletes = catalogue_delta(model, edited_catalogue(raw_catalogue)[0])
+    apply_delta(model, upserts, deletes, key=DELTA_KEY)
+    np.testing.assert_array_equal(model.arrays['neighbour_ids'], before)
+
+
+def test_load_resources_applies_file_changes(raw_catalogue, tmp_path):
+    csv_path, root = str(tmp_path / 'catalogue.csv'), str(tmp_path / 'artifacts')
+    raw_catalogue.to_csv(csv_path, index=False)
+    first = load_resources(csv_path, root)
+
+    edited, deleted = edited_catalogue(raw_catalogue)
+    edited.to_csv(csv_path, index=False)
+    updated = load_resources(csv_path, root, previous=first)
+
+    assert updated.version.endswith('-u1')
+    assert updated.model.drift['updates'] == 1
+    assert not set(deleted) & set(updated.df[DELTA_KEY])
+    assert len(updated.df) == len(edited)
+    assert_same_table(updated.model, rebuilt_table(updated.model))
+
+    # A restart finds the update saved for the new file
+    assert load_resources(csv_path, root).version == updated.version
+
+
+
+def test_file_changes_prune_superseded_artifacts(raw_catalogue, tmp_path, monkeypatch):
+    csv_path, root = str(tmp_path / 'catalogue.csv'), str(tmp_path / 'artifacts')
+    monkeypatch.setattr(resources, '_current', None)
+    versions = []
+    for price_step in range(3):
+        edited = raw_catalogue.copy()
+        edited.loc[:4, 'price'] = edited.loc[:4, 'price'] + price_step
+        edited.to_csv(csv_path, index=False)
+        versions.append(resources.reload_resources(csv_path, root).version)
+
+    assert [version.split('-')[-1] for version in versions[1:]] == ['u1', 'u2']
+    assert sorted(os.listdir(root)) == sorted(resources.version_key(version) for version in versions[1:])
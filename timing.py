@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# Set to 1 to time reruns, show the performance panel and write the JSONL log
+TIMING_ENV = 'SOUNDMATCH_TIMING'
+TIMING_LOG = os.path.join('.cache', 'timings.jsonl')
+# Most recent samples kept per span for the percentiles
+SPAN_WINDOW = 1000
+PERCENTILES = (50, 95, 99)
+
+_log_lock = threading.Lock()
+
+
+def timing_enabled():
+    return os.environ.get(TIMING_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class SpanStats:
+    """
+    Durations of named spans over the last SPAN_WINDOW reruns, safe to share
+    between the threads serving different sessions.
+    """
+
+    def __init__(self, window=SPAN_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, spans):
+        with self._lock:
+            for name, seconds in spans.items():
+                if name not in self._samples:
+                    self._samples[name] = deque(maxlen=self.window)
+                    self._counts[name] = 0
+                self._samples[name].append(seconds)
+                self._counts[name] += 1
+
+    def summary(self):
+        """Span name -> count, p50/p95/p99 and max in milliseconds over the window."""
+        with self._lock:
+            snapshot = {name: (self._counts[name], np.array(samples)) for name, samples in self._samples.items()}
+        summary = {}
+        for name, (count, samples) in sorted(snapshot.items()):
+            row = {'count': count}
+            row.update({f'p{q}_ms': value * 1000 for q, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES))})
+            row['max_ms'] = samples.max() * 1000
+            summary[name] = row
+        return summary
+
+
+# Spans of every session in this process
+process_stats = SpanStats()
+
+
+class _Span:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = self.timer.spans
+        spans[self.name] = spans.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class RerunTimer:
+    """
+    Timing spans of one script run. Wrap each section in span(name); a span
+    entered several times in a run adds up. finish() records the run, plus
+    its total as 'rerun', into the session's and the process's SpanStats and
+    appends it to the JSONL log.
+    """
+
+    enabled = True
+
+    def __init__(self, session_stats, session_id=None, log_path=TIMING_LOG):
+        self.session_stats = session_stats
+        self.session_id = session_id
+        self.log_path = log_path
+        self.spans = {}
+        self._start = time.perf_counter()
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def finish(self):
+        self.spans['rerun'] = time.perf_counter() - self._start
+        self.session_stats.add(self.spans)
+        process_stats.add(self.spans)
+        if self.log_path:
+            record = {
+                'time': time.time(),
+                'session': self.session_id,
+                'spans_ms': {name: seconds * 1000 for name, seconds in self.spans.items()},
+            }
+            _append_log(self.log_path, record)
+
+
+class NullTimer:
+    """Stand-in used while timing is disabled: every span is the same no-op context manager."""
+
+    enabled = False
+    spans = {}
+    _span = nullcontext()
+
+    def span(self, name):
+        return self._span
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def _append_log(path, record):
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a') as f:
+                f.write(json.dumps(record, sort_keys=True) + '\n')
+    except OSError:
+        pass
+
+
+def start_rerun(session_stats, session_id=None, enabled=None, log_path=TIMING_LOG):
+    """Timer for the run that is starting: a RerunTimer when timing is enabled, else NULL_TIMER."""
+    if enabled is None:
+        enabled = timing_enabled()
+    return RerunTimer(session_stats, session_id, log_path) if enabled else NULL_TIMER
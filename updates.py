@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, hstack, vstack
+
+from catalogue import (
+    NORMALIZED_FEATURES,
+    NUMERIC_FEATURES,
+    CatalogueModel,
+    DescriptionSpool,
+    build_model,
+    combined_texts,
+    concat_chunks,
+    enrich_catalogue,
+    weighted_numeric_features,
+)
+from recommender import SimilarityEngine, distinct_neighbours
+
+# Share of tokens in updated rows missing from the fitted vocabulary above which a full refit is due
+VOCABULARY_DRIFT_THRESHOLD = 0.1
+
+
+# Enrich raw delta rows and transform them with the already fitted scaler and vectorizer
+def transform_rows(model, rows):
+    rows = enrich_catalogue(rows.reset_index(drop=True).copy())
+    normalized = model.scaler.transform(rows[NUMERIC_FEATURES])
+    rows[NORMALIZED_FEATURES] = normalized.astype(np.float32)
+
+    tfidf_rows = model.tfidf.transform(combined_texts(rows))
+    numerical_features = weighted_numeric_features(normalized, model.numeric_weights)
+    feature_rows = hstack([tfidf_rows, numerical_features]).tocsr()
+
+    embedding_rows = None
+    if 'embeddings' in model.arrays:
+        text_embedding = tfidf_rows @ np.asarray(model.arrays['svd_components']).T
+        embedding_rows = np.hstack([text_embedding, numerical_features]).astype(np.float32)
+
+    return rows, feature_rows, embedding_rows
+
+
+# Token counts of rows, and how many of those tokens the fitted vocabulary does not know
+def vocabulary_drift(model, rows):
+    analyzer = model.tfidf.build_analyzer()
+    vocabulary = model.tfidf.vocabulary_
+    tokens = unknown = 0
+    for text in combined_texts(rows):
+        for token in analyzer(text):
+            tokens += 1
+            unknown += token not in vocabulary
+    return tokens, unknown
+
+
+def apply_delta(model, upserts=None, deletes=(), key='link', drift_threshold=VOCABULARY_DRIFT_THRESHOLD):
+    """
+    Apply a catalogue delta without refitting the scaler or vectorizer.
+
+    upserts is a DataFrame of raw catalogue rows: a row whose key matches an
+    existing product replaces it in place (the first one, if the key is not
+    unique), anything else is appended. deletes lists keys whose rows are
+    removed; deletes are applied before upserts. Only the neighbour lists the
+    change can affect are recomputed.
+
+    Returns (new_model, report). The input model is left untouched, so it can
+    keep serving until the caller swaps in the new one. report['needs_refit']
+    turns True once the vocabulary drift since the last full fit crosses
+    drift_threshold; call refit_model() then.
+    """
+    df = model.df
+    old_n = len(df)
+    keys = df[key].astype(str).to_numpy()
+    deleted = np.isin(keys, [str(k) for k in deletes])
+
+    if upserts is None or len(upserts) == 0:
+        rows = df.iloc[:0].copy()
+        feature_rows = csr_matrix((0, model.feature_matrix.shape[1]))
+        embedding_rows = np.asarray(model.arrays['embeddings'])[:0] if 'embeddings' in model.arrays else None
+    else:
+        rows, feature_rows, embedding_rows = transform_rows(model, upserts)
+
+    # Which upserts replace a surviving row and which are appended
+    first_row = {}
+    for position in np.flatnonzero(~deleted)[::-1]:
+        first_row[keys[position]] = position
+    replace_src, replace_pos, append_src = [], [], []
+    for j, row_key in enumerate(rows[key].astype(str)):
+        if row_key in first_row:
+            replace_src.append(j)
+            replace_pos.append(first_row[row_key])
+        else:
+            append_src.append(j)
+    replace_src, replace_pos, append_src = (np.array(a, dtype=np.int64) for a in (replace_src, replace_pos, append_src))
+
+    # Final row order as indices into [old rows, delta rows]
+    source = np.arange(old_n)
+    source[replace_pos] = old_n + replace_src
+    order = np.concatenate([source[~deleted], old_n + append_src])
+
+    new_df = concat_chunks([df, rows[df.columns]]).iloc[order].reset_index(drop=True)
+    new_matrix = vstack([csr_matrix(model.feature_matrix), feature_rows]).tocsr()[order]
+    row_arrays = ('embeddings', 'neighbour_ids', 'neighbour_scores', 'description_bytes', 'description_offsets')
+    arrays = {name: array for name, array in model.arrays.items() if name not in row_arrays}
+    if embedding_rows is not None:
+        arrays['embeddings'] = np.vstack([np.asarray(model.arrays['embeddings']), embedding_rows])[order]
+    if model.descriptions is not None:
+        new_texts = list(rows.get('description', ()))
+        spool = DescriptionSpool()
+        spool.append(model.descriptions[i] if i < old_n else new_texts[i - old_n] for i in order)
+        arrays.update(spool.finish().to_arrays())
+
+    tokens, unknown = vocabulary_drift(model, rows) if len(rows) else (0, 0)
+    drift = {
+        'tokens': model.drift['tokens'] + tokens,
+        'unknown_tokens': model.drift['unknown_tokens'] + unknown,
+        'updates': model.drift.get('updates', 0) + 1,
+    }
+
+    new_model = CatalogueModel(new_df, new_matrix, model.tfidf, model.scaler, arrays, model.numeric_weights, drift,
+                               model.neighbour_exact)
+
+    # Old row id -> new row id (-1 for deleted rows) and the new ids whose content changed
+    old_to_new = np.full(old_n, -1, dtype=np.int64)
+    old_to_new[~deleted] = np.arange(int((~deleted).sum()))
+    changed = np.concatenate([old_to_new[replace_pos], len(order) - len(append_src) + np.arange(len(append_src))])
+
+    recomputed = update_neighbour_table(model, new_model, old_to_new, deleted, changed)
+
+    ratio = drift_ratio(drift)
+    report = {
+        'replaced': len(replace_src),
+        'appended': len(append_src),
+        'deleted': int(deleted.sum()),
+        'neighbour_rows_recomputed': recomputed,
+        'vocabulary_drift': ratio,
+        'needs_refit': ratio > drift_threshold,
+    }
+    return new_model, report
+
+
+# Share of the tokens seen in updates since the last full fit that the vocabulary does not know
+def drift_ratio(drift):
+    return drift['unknown_tokens'] / drift['tokens'] if drift['tokens'] else 0.0
+
+
+def needs_refit(model, drift_threshold=VOCABULARY_DRIFT_THRESHOLD):
+    return drift_ratio(model.drift) > drift_threshold
+
+
+def update_neighbour_table(old_model, new_model, old_to_new, deleted, changed, block_size=256):
+    """
+    Carry the neighbour table over to new_model, recomputing only the rows
+    that changed, that pointed at a changed or deleted product, or that a
+    changed product now scores at least as high as their current k-th
+    neighbour. Returns the number of rows recomputed.
+    """
+    if 'neighbour_ids' not in old_model.arrays:
+        return 0
+
+    old_ids = np.asarray(old_model.arrays['neighbour_ids'])
+    old_scores = np.asarray(old_model.arrays['neighbour_scores'])
+    n, k = len(new_model.df), old_ids.shape[1]
+
+    # Surviving rows keep their lists, with ids remapped to the new row order
+    kept = np.flatnonzero(~deleted)
+    neighbour_ids = np.full((n, k), -1, dtype=np.int32)
+    neighbour_scores = np.full((n, k), np.nan, dtype=np.float32)
+    carried = old_ids[kept]
+    remapped = np.where(carried >= 0, old_to_new[np.maximum(carried, 0)], -1)
+    neighbour_ids[:len(kept)] = remapped
+    neighbour_scores[:len(kept)] = old_scores[kept]
+
+    stale = np.zeros(n, dtype=bool)
+    stale[changed] = True
+    is_changed = stale.copy()
+    # Lists that lost an entry to a deletion or that reference a changed product
+    stale[:len(kept)] |= ((carried >= 0) & (remapped < 0)).any(axis=1)
+    stale[:len(kept)] |= (is_changed[np.maximum(remapped, 0)] & (remapped >= 0)).any(axis=1)
+
+    engine = SimilarityEngine(new_model.similarity_features())
+    base_models = pd.factorize(new_model.df['base_model'])[0]
+
+    # Lists a changed product may now enter (similarity is symmetric, so one block of scores suffices)
+    if len(changed):
+        changed_scores = engine.rows_scores(changed)
+        kth = np.where(neighbour_ids[:, -1] >= 0, neighbour_scores[:, -1], -np.inf)
+        stale |= (changed_scores >= kth - 1e-6).any(axis=0)
+
+    rows = np.flatnonzero(stale)
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        for i, scores in zip(block_rows, engine.rows_scores(block_rows)):
+            top = distinct_neighbours(scores, i, base_models, k)
+            neighbour_ids[i] = -1
+            neighbour_scores[i] = np.nan
+            neighbour_ids[i, :len(top)] = top
+            neighbour_scores[i, :len(top)] = scores[top]
+
+    new_model.arrays['neighbour_ids'] = neighbour_ids
+    new_model.arrays['neighbour_scores'] = neighbour_scores
+    return len(rows)
+
+
+# Full refit on the current catalogue, e.g. once an update reports needs_refit
+def refit_model(model):
+    embedding_dim = model.arrays['svd_components'].shape[0] if 'svd_components' in model.arrays else 0
+    return build_model(model.df.copy(), embedding_dim=embedding_dim, numeric_weights=model.numeric_weights,
+                       descriptions=model.descriptions)